@@ -1 +0,0 @@
-print('Hello World')
\ No newline at end of file
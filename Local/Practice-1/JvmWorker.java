@@ -0,0 +1,276 @@
+/*
+ * Long-lived JVM worker used by the code executor's Java pool (see JvmWorkerPool in
+ * code_executor.py). Reads one command per line on stdin and answers with one line on
+ * stdout. Every field is Base64-encoded UTF-8 and fields are separated by tabs:
+ *
+ *   COMPILE <className> <source> <outDir>            ->  OK | ERR <diagnostics>
+ *   RUN <classDir> <className> <stdin> <maxBytes>    ->  DONE <exitCode> <stdout> <stderr> <recycle>
+ *                                                          <stdoutDropped> <stderrDropped>
+ *
+ * The exit code is "-" when the submission called System.exit(). In that case the JVM
+ * then exits, and the real status is the worker's process exit code. recycle is "1" when
+ * the job left threads behind or failed in a way that makes the worker unsafe to reuse.
+ * Each output stream keeps its first maxBytes / 2 bytes and its last maxBytes - maxBytes / 2
+ * bytes (returned back to back); the dropped fields, in plain decimal rather than Base64,
+ * count the bytes in between.
+ */
+import java.io.BufferedReader;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.InputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.io.StringWriter;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URI;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Paths;
+import java.util.Arrays;
+import java.util.Base64;
+import java.util.List;
+import java.util.Locale;
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+public class JvmWorker {
+    // Bound to the real stdout so submissions calling System.setOut cannot hijack the protocol
+    private static final PrintStream CONTROL =
+        new PrintStream(new FileOutputStream(FileDescriptor.out), true, StandardCharsets.UTF_8);
+
+    private static volatile boolean inJob = false;
+    private static volatile CappedOutputStream jobOut;
+    private static volatile CappedOutputStream jobErr;
+    private static volatile PrintStream jobOutStream;
+    private static volatile PrintStream jobErrStream;
+
+    public static void main(String[] args) throws Exception {
+        BufferedReader control = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        // Stray writes (e.g. from threads a submission leaves behind) must never reach the control channel
+        System.setOut(System.err);
+        Runtime.getRuntime().addShutdownHook(new Thread(JvmWorker::reportExit));
+
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        StandardJavaFileManager fileManager =
+            compiler == null ? null : compiler.getStandardFileManager(null, Locale.ROOT, StandardCharsets.UTF_8);
+
+        String line;
+        while ((line = control.readLine()) != null) {
+            String[] fields = line.split("\t", -1);
+            switch (fields[0]) {
+                case "COMPILE":
+                    compile(compiler, fileManager, decode(fields[1]), decode(fields[2]), decode(fields[3]));
+                    break;
+                case "RUN":
+                    run(decode(fields[1]), decode(fields[2]), Base64.getDecoder().decode(fields[3]),
+                        Integer.parseInt(decode(fields[4])));
+                    break;
+                default:
+                    respond("ERR", encode("Unknown command: " + fields[0]));
+            }
+        }
+    }
+
+    private static void compile(JavaCompiler compiler, StandardJavaFileManager fileManager,
+                                String className, String source, String outDir) {
+        if (compiler == null) {
+            respond("ERR", encode("No system Java compiler available (is a JDK installed?)"));
+            return;
+        }
+
+        JavaFileObject unit = new SimpleJavaFileObject(
+                URI.create("string:///" + className + ".java"), JavaFileObject.Kind.SOURCE) {
+            @Override
+            public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+                return source;
+            }
+        };
+
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        StringWriter extra = new StringWriter();
+        boolean ok = compiler.getTask(extra, fileManager, diagnostics,
+                Arrays.asList("-proc:none", "-d", outDir), null, List.of(unit)).call();
+
+        if (ok) {
+            respond("OK");
+            return;
+        }
+
+        // Mirror the "File.java:line: error: message" layout of command-line javac
+        StringBuilder report = new StringBuilder(extra.toString());
+        for (Diagnostic<? extends JavaFileObject> d : diagnostics.getDiagnostics()) {
+            if (d.getSource() != null) {
+                report.append(className).append(".java:").append(d.getLineNumber()).append(": ");
+            }
+            report.append(d.getKind().toString().toLowerCase(Locale.ROOT)).append(": ")
+                  .append(d.getMessage(Locale.ROOT)).append('\n');
+        }
+        respond("ERR", encode(report.toString()));
+    }
+
+    private static void run(String classDir, String className, byte[] stdin, int maxBytes) {
+        PrintStream originalOut = System.out;
+        PrintStream originalErr = System.err;
+        InputStream originalIn = System.in;
+        int threadsBefore = Thread.activeCount();
+
+        jobOut = new CappedOutputStream(maxBytes);
+        jobErr = new CappedOutputStream(maxBytes);
+        jobOutStream = new PrintStream(jobOut, false, StandardCharsets.UTF_8);
+        jobErrStream = new PrintStream(jobErr, false, StandardCharsets.UTF_8);
+
+        int exitCode = 0;
+        boolean recycle = false;
+
+        System.setIn(new ByteArrayInputStream(stdin));
+        System.setOut(jobOutStream);
+        System.setErr(jobErrStream);
+        inJob = true;
+
+        // A fresh loader per job isolates the submission's static state from earlier jobs
+        try (URLClassLoader loader = new URLClassLoader(
+                new URL[] {Paths.get(classDir).toUri().toURL()}, ClassLoader.getPlatformClassLoader())) {
+            Class<?> cls = Class.forName(className, true, loader);
+            Method main = cls.getMethod("main", String[].class);
+            main.invoke(null, (Object) new String[0]);
+        } catch (InvocationTargetException | ExceptionInInitializerError e) {
+            Throwable cause = e.getCause() != null ? e.getCause() : e;
+            jobErrStream.print("Exception in thread \"main\" ");
+            cause.printStackTrace(jobErrStream);
+            exitCode = 1;
+        } catch (Throwable t) {
+            jobErrStream.print("Error: ");
+            t.printStackTrace(jobErrStream);
+            exitCode = 1;
+            recycle = true;
+        } finally {
+            jobOutStream.flush();
+            jobErrStream.flush();
+            inJob = false;
+            System.setIn(originalIn);
+            System.setOut(originalOut);
+            System.setErr(originalErr);
+        }
+
+        if (Thread.activeCount() > threadsBefore) {
+            recycle = true;
+        }
+
+        respond("DONE", Integer.toString(exitCode), encode(jobOut.retained()), encode(jobErr.retained()),
+                recycle ? "1" : "0", Long.toString(jobOut.dropped()), Long.toString(jobErr.dropped()));
+    }
+
+    /** Shutdown hook: flush the captured output of a job that called System.exit(). */
+    private static void reportExit() {
+        if (!inJob) {
+            return;
+        }
+        jobOutStream.flush();
+        jobErrStream.flush();
+        respond("DONE", "-", encode(jobOut.retained()), encode(jobErr.retained()), "1",
+                Long.toString(jobOut.dropped()), Long.toString(jobErr.dropped()));
+    }
+
+    /**
+     * Output sink with bounded memory: a head buffer that grows as the first bytes are
+     * written and a ring buffer for the last ones, allocated once the head is full,
+     * counting whatever falls out of the ring (same layout as OutputWindow in
+     * code_executor.py).
+     */
+    private static final class CappedOutputStream extends OutputStream {
+        private final ByteArrayOutputStream head = new ByteArrayOutputStream();
+        private final int headLimit;
+        private final int ringSize;
+        private byte[] ring = null;
+        private long ringWritten = 0;
+
+        CappedOutputStream(int maxBytes) {
+            headLimit = maxBytes / 2;
+            ringSize = maxBytes - headLimit;
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            write(new byte[] {(byte) b}, 0, 1);
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            int room = Math.min(headLimit - head.size(), len);
+            if (room > 0) {
+                head.write(b, off, room);
+                off += room;
+                len -= room;
+            }
+            if (len == 0) {
+                return;
+            }
+
+            if (ring == null) {
+                ring = new byte[ringSize];
+            }
+            if (len > ringSize) {
+                // Only the last ring-sized part of the write can survive
+                ringWritten += len - ringSize;
+                off += len - ringSize;
+                len = ringSize;
+            }
+            while (len > 0) {
+                int position = (int) (ringWritten % ringSize);
+                int count = Math.min(ringSize - position, len);
+                System.arraycopy(b, off, ring, position, count);
+                ringWritten += count;
+                off += count;
+                len -= count;
+            }
+        }
+
+        synchronized byte[] retained() {
+            ByteArrayOutputStream out = new ByteArrayOutputStream();
+            out.write(head.toByteArray(), 0, head.size());
+            if (ring == null) {
+                return out.toByteArray();
+            }
+            if (ringSize == 0 || ringWritten <= ringSize) {
+                out.write(ring, 0, (int) Math.min(ringWritten, ringSize));
+            } else {
+                int position = (int) (ringWritten % ringSize);
+                out.write(ring, position, ringSize - position);
+                out.write(ring, 0, position);
+            }
+            return out.toByteArray();
+        }
+
+        synchronized long dropped() {
+            return Math.max(0, ringWritten - ringSize);
+        }
+    }
+
+    private static synchronized void respond(String... fields) {
+        CONTROL.print(String.join("\t", fields));
+        CONTROL.print('\n');
+        CONTROL.flush();
+    }
+
+    private static String decode(String field) {
+        return new String(Base64.getDecoder().decode(field), StandardCharsets.UTF_8);
+    }
+
+    private static String encode(String value) {
+        return encode(value.getBytes(StandardCharsets.UTF_8));
+    }
+
+    private static String encode(byte[] value) {
+        return Base64.getEncoder().encodeToString(value);
+    }
+}
@@ -0,0 +1,231 @@
+/*
+ * Long-lived Node.js worker used by the code executor's JavaScript pool (see NodeWorkerPool
+ * in code_executor.py). Started as
+ *
+ *   node NodeWorker.js <heapMb> <controlInFd> <controlOutFd>
+ *
+ * it reads one command per line from controlInFd and answers with one line on
+ * controlOutFd; its own stdin and stdout are not used, so a submission writing to fd 1
+ * cannot corrupt the protocol. Every field is Base64-encoded UTF-8 and fields are
+ * separated by tabs:
+ *
+ *   RUN <file> <stdin> <stdinFile> <maxBytes> <timeoutMs>
+ *       ->  DONE <exitCode> <stdout> <stderr> <limit> <stdoutDropped> <stderrDropped>
+ *
+ * Each job runs as the main module of its own worker_threads isolate with its own
+ * process.stdin/stdout/stderr and a heap capped at heapMb. Starting an isolate is the
+ * expensive part, so the next one is started as soon as a job begins and waits
+ * (blocked in Atomics.wait) until it is handed a file. stdin is sent inline, or streamed
+ * from stdinFile when that is non-empty. The isolate's process.stdin is an in-memory
+ * stream (or a stream over stdinFile) rather than the worker_threads stdin pipe, which
+ * keeps an isolate alive for as long as input is left unread; like `node <file>`, a job
+ * ends when its event loop does, whatever it did not read. limit is "-", "timeout" (the
+ * isolate ran past timeoutMs and was terminated) or "memory" (it hit the heap cap). Each
+ * output stream keeps its first maxBytes / 2 bytes and its last maxBytes - maxBytes / 2
+ * bytes (returned back to back); the dropped fields, in plain decimal rather than Base64,
+ * count the bytes in between.
+ */
+'use strict';
+
+const fs = require('fs');
+const readline = require('readline');
+const util = require('util');
+const { Worker } = require('worker_threads');
+
+const [heapMb, controlIn, controlOut] = process.argv.slice(2).map(Number);
+
+// Runs inside each isolate: wait for the job, give it its stdin (created on first use, as
+// node does), then load its file exactly as `node <file>` would
+const BOOTSTRAP = `
+const { workerData, parentPort, receiveMessageOnPort } = require('worker_threads');
+Atomics.wait(new Int32Array(workerData), 0, 0);
+const job = receiveMessageOnPort(parentPort).message;
+let stdin;
+Object.defineProperty(process, 'stdin', {
+    configurable: true,
+    enumerable: true,
+    get() {
+        if (stdin === undefined) {
+            if (job.stdinFd >= 0) {
+                stdin = require('fs').createReadStream(null, { fd: job.stdinFd, autoClose: false });
+            } else {
+                stdin = new (require('stream').PassThrough)();
+                stdin.end(Buffer.from(job.stdin));
+            }
+        }
+        return stdin;
+    }
+});
+process.argv[1] = job.file;
+require('module').runMain();
+`;
+
+/**
+ * Output sink with bounded memory: a head that collects the first bytes written as
+ * they arrive and a ring buffer for the last ones, allocated once the head is full,
+ * counting whatever falls out of the ring (same layout as OutputWindow in
+ * code_executor.py).
+ */
+class CappedOutput {
+    constructor(maxBytes) {
+        this.headChunks = [];
+        this.headLength = 0;
+        this.headLimit = Math.floor(maxBytes / 2);
+        this.ring = null;
+        this.ringSize = maxBytes - this.headLimit;
+        this.ringWritten = 0;
+    }
+
+    write(chunk) {
+        const room = Math.min(this.headLimit - this.headLength, chunk.length);
+        if (room > 0) {
+            this.headChunks.push(Buffer.from(chunk.subarray(0, room)));
+            this.headLength += room;
+            chunk = chunk.subarray(room);
+        }
+        if (chunk.length === 0) {
+            return;
+        }
+
+        if (this.ring === null) {
+            this.ring = Buffer.alloc(this.ringSize);
+        }
+        if (chunk.length > this.ringSize) {
+            // Only the last ring-sized part of the write can survive
+            this.ringWritten += chunk.length - this.ringSize;
+            chunk = chunk.subarray(chunk.length - this.ringSize);
+        }
+        while (chunk.length > 0) {
+            const position = this.ringWritten % this.ringSize;
+            const count = Math.min(this.ringSize - position, chunk.length);
+            chunk.copy(this.ring, position, 0, count);
+            this.ringWritten += count;
+            chunk = chunk.subarray(count);
+        }
+    }
+
+    retained() {
+        if (this.ring === null) {
+            return Buffer.concat(this.headChunks, this.headLength);
+        }
+        if (this.ringSize === 0 || this.ringWritten <= this.ringSize) {
+            return Buffer.concat([...this.headChunks, this.ring.subarray(0, Math.min(this.ringWritten, this.ringSize))]);
+        }
+        const position = this.ringWritten % this.ringSize;
+        return Buffer.concat([...this.headChunks, this.ring.subarray(position), this.ring.subarray(0, position)]);
+    }
+
+    dropped() {
+        return Math.max(0, this.ringWritten - this.ringSize);
+    }
+}
+
+function startIsolate() {
+    const signal = new SharedArrayBuffer(4);
+    const isolate = new Worker(BOOTSTRAP, {
+        eval: true,
+        workerData: signal,
+        stdout: true,
+        stderr: true,
+        resourceLimits: { maxOldGenerationSizeMb: heapMb }
+    });
+    isolate.signal = new Int32Array(signal);
+    // A spare that dies before it is used (e.g. a failed start) is replaced on the next job
+    isolate.on('error', () => {});
+    isolate.on('exit', () => { isolate.exited = true; });
+    return isolate;
+}
+
+let spare = startIsolate();
+
+function streamEnd(stream) {
+    return new Promise(resolve => {
+        stream.on('end', resolve);
+        stream.on('close', resolve);
+    });
+}
+
+async function run(file, stdin, stdinFile, maxBytes, timeoutMs) {
+    const isolate = spare.exited ? startIsolate() : spare;
+    spare = startIsolate();
+
+    const out = new CappedOutput(maxBytes);
+    const err = new CappedOutput(maxBytes);
+    isolate.stdout.on('data', chunk => out.write(chunk));
+    isolate.stderr.on('data', chunk => err.write(chunk));
+    const drained = Promise.all([streamEnd(isolate.stdout), streamEnd(isolate.stderr)]);
+
+    let limit = '-';
+    isolate.removeAllListeners('error');
+    isolate.on('error', e => {
+        if (e && e.code === 'ERR_WORKER_OUT_OF_MEMORY') {
+            limit = 'memory';
+            err.write(Buffer.from(`JavaScript heap limit of ${heapMb} MB exceeded\n`));
+        } else {
+            // Mirror what node prints for an uncaught exception
+            err.write(Buffer.from(`${e instanceof Error ? e.stack : 'Uncaught ' + util.inspect(e)}\n`));
+        }
+    });
+    const exited = new Promise(resolve => isolate.once('exit', resolve));
+
+    // Descriptors are shared by every thread of the process, so the isolate reads the
+    // stored input through one opened here and closed once the job is over
+    let stdinFd = -1;
+    if (stdinFile) {
+        try {
+            stdinFd = fs.openSync(stdinFile, 'r');
+        } catch (e) {
+            err.write(Buffer.from(`Cannot open stdin file: ${e.message}\n`));
+        }
+    }
+
+    isolate.postMessage({ file, stdin, stdinFd });
+    Atomics.store(isolate.signal, 0, 1);
+    Atomics.notify(isolate.signal, 0);
+
+    const timer = setTimeout(() => {
+        limit = 'timeout';
+        isolate.terminate();
+    }, timeoutMs);
+    let exitCode = await exited;
+    clearTimeout(timer);
+    await drained;
+    if (stdinFd >= 0) {
+        fs.closeSync(stdinFd);
+    }
+
+    if (limit === 'memory' && exitCode === 0) {
+        exitCode = 1;
+    }
+    return ['DONE', String(exitCode), encode(out.retained()), encode(err.retained()), limit,
+            String(out.dropped()), String(err.dropped())];
+}
+
+function encode(data) {
+    return Buffer.from(data).toString('base64');
+}
+
+function decode(field) {
+    return Buffer.from(field, 'base64');
+}
+
+function respond(fields) {
+    fs.writeSync(controlOut, fields.join('\t') + '\n');
+}
+
+async function main() {
+    const lines = readline.createInterface({ input: fs.createReadStream(null, { fd: controlIn }) });
+    for await (const line of lines) {
+        const fields = line.split('\t');
+        if (fields[0] === 'RUN') {
+            const [file, stdin, stdinFile, maxBytes, timeoutMs] = fields.slice(1).map(decode);
+            respond(await run(file.toString(), stdin, stdinFile.toString(), Number(maxBytes.toString()),
+                              Number(timeoutMs.toString())));
+        } else {
+            respond(['ERR', encode(`Unknown command: ${fields[0]}`)]);
+        }
+    }
+    process.exit(0);
+}
+
+main();
@@ -0,0 +1,441 @@
+"""
+Benchmark harness for the code executor.
+
+Drives MCPCodeExecutor.execute_code in-process ("direct" mode) and the execute_code
+tool of code_executor.py through a local streamable-HTTP server ("mcp" mode) with a
+corpus of hello-world, CPU-bound, IO-heavy and compile-heavy programs in every
+supported language. Each (mode, concurrency, workload, language) cell reports latency
+percentiles, throughput and the mean per-phase split taken from the results'
+timings, and the whole run is saved as JSON so it can be compared with a baseline.
+
+Run with:
+    python benchmark_executor.py --mode both --concurrency 1,4,16 --output bench.json
+    python benchmark_executor.py --languages python,cpp --workloads cpu --baseline bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from typing import Dict, Any, Optional, List, Callable, Awaitable, Tuple
+
+LANGUAGES = ['python', 'javascript', 'cpp', 'java']
+MODES = ['direct', 'mcp']
+PHASES = ['setup', 'write', 'compile', 'spawn', 'run', 'teardown']
+
+# Line-comment prefix used to make every request a distinct source in --cold mode
+COMMENT_PREFIX = {'python': '#', 'javascript': '//', 'cpp': '//', 'java': '//'}
+
+# Tools a language needs on PATH; languages without them are skipped
+REQUIRED_TOOLS = {'python': ['python'], 'javascript': ['node'], 'cpp': ['g++'], 'java': ['javac', 'java']}
+
+CPU_ITERATIONS = 2_000_000
+IO_LINES = 20_000
+IO_INPUT = ''.join(f'{i}\n' for i in range(IO_LINES))
+
+
+def _generated_python(functions: int) -> str:
+    """Large, many-function Python module: parse/compile time dominates the run"""
+    body = ''.join(
+        f'def f{i}(x):\n    y = [x * {i} + k for k in range(3)]\n    return sum(y) % 97\n\n'
+        for i in range(functions)
+    )
+    return body + f'print(sum(f{functions - 1}(i) for i in range(10)))\n'
+
+
+def _generated_javascript(functions: int) -> str:
+    """Large, many-function JavaScript source: parse time dominates the run"""
+    body = ''.join(
+        f'function f{i}(x) {{ const y = [0, 1, 2].map(k => x * {i} + k); return y.reduce((a, b) => a + b, 0) % 97; }}\n'
+        for i in range(functions)
+    )
+    return body + f'let total = 0;\nfor (let i = 0; i < 10; i++) total += f{functions - 1}(i);\nconsole.log(total);\n'
+
+
+# workload -> language -> (code, stdin)
+WORKLOADS: Dict[str, Dict[str, Tuple[str, str]]] = {
+    'hello': {
+        'python': ('print("Hello, World!")\n', ''),
+        'javascript': ('console.log("Hello, World!");\n', ''),
+        'cpp': ('#include <iostream>\n\nint main() {\n    std::cout << "Hello, World!" << std::endl;\n    return 0;\n}\n', ''),
+        'java': ('public class Main {\n    public static void main(String[] args) {\n'
+                 '        System.out.println("Hello, World!");\n    }\n}\n', '')
+    },
+    'cpu': {
+        'python': (f'total = 0\nfor i in range({CPU_ITERATIONS}):\n    total = (total + i * i) % 1000003\nprint(total)\n', ''),
+        'javascript': (f'let total = 0;\nfor (let i = 0; i < {CPU_ITERATIONS}; i++) total = (total + i * i) % 1000003;\n'
+                       'console.log(total);\n', ''),
+        'cpp': ('#include <iostream>\n\nint main() {\n    long long total = 0;\n'
+                f'    for (long long i = 0; i < {CPU_ITERATIONS}; i++) total = (total + i * i) % 1000003;\n'
+                '    std::cout << total << std::endl;\n    return 0;\n}\n', ''),
+        'java': ('public class Main {\n    public static void main(String[] args) {\n        long total = 0;\n'
+                 f'        for (long i = 0; i < {CPU_ITERATIONS}; i++) total = (total + i * i) % 1000003;\n'
+                 '        System.out.println(total);\n    }\n}\n', '')
+    },
+    'io': {
+        'python': ('import sys\nout = [str(int(line) * 2) for line in sys.stdin]\nprint("\\n".join(out))\n', IO_INPUT),
+        'javascript': ('const lines = require("fs").readFileSync(0, "utf8").trim().split("\\n");\n'
+                       'console.log(lines.map(x => String(Number(x) * 2)).join("\\n"));\n', IO_INPUT),
+        'cpp': ('#include <iostream>\n\nint main() {\n    std::ios::sync_with_stdio(false);\n    std::cin.tie(nullptr);\n'
+                '    long long x;\n    while (std::cin >> x) std::cout << x * 2 << \'\\n\';\n    return 0;\n}\n', IO_INPUT),
+        'java': ('import java.io.*;\n\npublic class Main {\n    public static void main(String[] args) throws IOException {\n'
+                 '        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));\n'
+                 '        StringBuilder out = new StringBuilder();\n        String line;\n'
+                 '        while ((line = in.readLine()) != null) out.append(Long.parseLong(line.trim()) * 2).append(\'\\n\');\n'
+                 '        System.out.print(out);\n    }\n}\n', IO_INPUT)
+    },
+    'compile': {
+        'python': (_generated_python(2000), ''),
+        'javascript': (_generated_javascript(2000), ''),
+        'cpp': ('#include <bits/stdc++.h>\nusing namespace std;\n\n'
+                'template <typename T> T fold(const vector<T>& v) { return accumulate(v.begin(), v.end(), T{}); }\n\n'
+                'int main() {\n    map<string, vector<int>> groups;\n    for (int i = 0; i < 100; i++) groups[to_string(i % 7)].push_back(i);\n'
+                '    set<long long> sums;\n    for (auto& [k, v] : groups) sums.insert(fold(v));\n'
+                '    vector<pair<int, string>> ranked;\n    for (auto& [k, v] : groups) ranked.emplace_back((int)v.size(), k);\n'
+                '    sort(ranked.begin(), ranked.end(), greater<>());\n    unordered_map<string, double> avg;\n'
+                '    for (auto& [k, v] : groups) avg[k] = fold(v) / double(v.size());\n'
+                '    priority_queue<int> pq(sums.begin(), sums.end());\n'
+                '    cout << pq.top() << " " << ranked.front().second << " " << fixed << setprecision(2) << avg["3"] << endl;\n'
+                '    return 0;\n}\n', ''),
+        'java': ('import java.util.*;\nimport java.util.stream.*;\n\npublic class Main {\n'
+                 '    record Item(String group, int value) {}\n\n'
+                 '    static <T extends Comparable<T>> T best(Collection<T> values) { return Collections.max(values); }\n\n'
+                 '    public static void main(String[] args) {\n'
+                 '        List<Item> items = IntStream.range(0, 100).mapToObj(i -> new Item("g" + (i % 7), i)).collect(Collectors.toList());\n'
+                 '        Map<String, IntSummaryStatistics> stats = items.stream()\n'
+                 '            .collect(Collectors.groupingBy(Item::group, TreeMap::new, Collectors.summarizingInt(Item::value)));\n'
+                 '        Optional<String> top = stats.entrySet().stream()\n'
+                 '            .sorted(Map.Entry.comparingByValue(Comparator.comparingLong(IntSummaryStatistics::getSum)))\n'
+                 '            .map(Map.Entry::getKey).reduce((a, b) -> b);\n'
+                 '        System.out.println(top.orElse("none") + " " + best(stats.keySet()));\n    }\n}\n', '')
+    }
+}
+
+Runner = Callable[[str, str, str, str], Awaitable[Dict[str, Any]]]
+
+
+def available_languages(languages: List[str]) -> List[str]:
+    """Languages whose toolchain is installed; the rest are reported and skipped"""
+    found = []
+    for language in languages:
+        missing = [tool for tool in REQUIRED_TOOLS[language] if shutil.which(tool) is None]
+        if missing:
+            print(f"Skipping {language}: {', '.join(missing)} not found", file=sys.stderr)
+        else:
+            found.append(language)
+    return found
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile of values (None when there are none)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))], 6)
+
+
+def summarize(samples: List[Dict[str, Any]], wall_time: float) -> Dict[str, Any]:
+    """Reduce per-request samples to latency percentiles, throughput and the phase split"""
+    latencies = [s['latency'] for s in samples]
+    errors = [s for s in samples if not s['success']]
+    phases = {}
+    for phase in PHASES:
+        values = [s['timings'][phase] for s in samples if s['timings'].get(phase) is not None]
+        if values:
+            phases[phase] = {'mean': round(sum(values) / len(values), 6), 'p50': percentile(values, 0.5)}
+
+    return {
+        'requests': len(samples),
+        'errors': len(errors),
+        'first_error': errors[0]['error'][:500] if errors else None,
+        'latency': {
+            'p50': percentile(latencies, 0.5),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+            'mean': round(sum(latencies) / len(latencies), 6) if latencies else None,
+            'min': percentile(latencies, 0.0),
+            'max': percentile(latencies, 1.0)
+        },
+        'throughput_rps': round(len(samples) / wall_time, 3) if wall_time > 0 else None,
+        'wall_time': round(wall_time, 3),
+        'queue_time_mean': round(sum(s['queue_time'] for s in samples) / len(samples), 6) if samples else None,
+        'phases': phases
+    }
+
+
+async def run_cell(runners: List[Runner], workload: str, language: str, iterations: int,
+                   warmup: int, cold: bool) -> Dict[str, Any]:
+    """
+    Run one workload/language pair with one worker per runner
+
+    Args:
+        runners (list): One execute function per concurrent worker
+        workload (str): Key of WORKLOADS
+        language (str): Language to run it in
+        iterations (int): Measured requests, spread over the workers
+        warmup (int): Unmeasured requests issued first (they fill the compile cache)
+        cold (bool): Append a unique comment to every measured request so no cache can serve it
+
+    Returns:
+        summarize() of the measured requests
+    """
+    code, input_data = WORKLOADS[workload][language]
+
+    for _ in range(warmup):
+        await runners[0](code, language, input_data, 'bench-warmup')
+
+    pending = list(range(iterations))
+    samples = []
+
+    async def worker(index: int, runner: Runner) -> None:
+        while pending:
+            pending.pop()
+            source = code
+            if cold:
+                source = f'{code}\n{COMMENT_PREFIX[language]} {uuid.uuid4().hex}\n'
+            start = time.perf_counter()
+            try:
+                result = await runner(source, language, input_data, f'bench-{index}')
+            except Exception as e:
+                result = {'success': False, 'error': f'{type(e).__name__}: {e}'}
+            samples.append({
+                'latency': time.perf_counter() - start,
+                'success': bool(result.get('success')),
+                'error': result.get('error') or '',
+                'queue_time': result.get('queue_time') or 0.0,
+                'timings': result.get('timings') or {}
+            })
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(i, runner) for i, runner in enumerate(runners)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def direct_runners(args: argparse.Namespace, concurrency: int) -> Tuple[List[Runner], Callable[[], None]]:
+    """In-process executor shared by all workers"""
+    from code_executor import MCPCodeExecutor
+
+    executor = MCPCodeExecutor(
+        timeout=args.timeout,
+        max_workers=args.max_workers,
+        max_queued_jobs=max(64, concurrency),
+        java_pool_size=args.java_pool_size,
+        node_pool_size=args.node_pool_size,
+        python_fork_server=args.python_fork_server
+    )
+
+    async def run(code: str, language: str, input_data: str, client_id: str) -> Dict[str, Any]:
+        return await executor.execute_code(code, language, input_data, client_id=client_id, deterministic=False)
+
+    def close() -> None:
+        for pool in (executor.java_pool, executor.node_pool, executor.fork_server):
+            if pool is not None:
+                pool.close()
+
+    return [run] * concurrency, close
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def start_server(port: int, log_path: str, workers: int = 1) -> subprocess.Popen:
+    """
+    Start code_executor.py on a local streamable-HTTP port and wait until it accepts connections;
+    with workers > 1 the port is served by executor_supervisor.py and that many worker processes
+    """
+    if workers > 1:
+        command = [sys.executable, 'executor_supervisor.py', '--workers', str(workers), '--port', str(port)]
+    else:
+        # FastMCP's constructor arguments take precedence over FASTMCP_* variables, so set the port directly
+        bootstrap = (
+            'import code_executor\n'
+            f'code_executor.mcp.settings.port = {port}\n'
+            'code_executor.mcp.run(transport="streamable-http")\n'
+        )
+        command = [sys.executable, '-c', bootstrap]
+    with open(log_path, 'w') as log:
+        server = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT,
+                                  cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f'MCP server exited with status {server.returncode}; see {log_path}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return server
+        except OSError:
+            await asyncio.sleep(0.2)
+    server.kill()
+    raise RuntimeError(f'MCP server did not start listening on port {port}; see {log_path}')
+
+
+async def run_mode(mode: str, args: argparse.Namespace, languages: List[str]) -> List[Dict[str, Any]]:
+    """Run every concurrency/workload/language cell for one mode"""
+    cells = []
+
+    async def measure(runners: List[Runner], concurrency: int) -> None:
+        for workload in args.workloads:
+            for language in languages:
+                stats = await run_cell(runners, workload, language, args.iterations, args.warmup, args.cold)
+                cell = {'mode': mode, 'concurrency': concurrency, 'workload': workload, 'language': language, **stats}
+                cells.append(cell)
+                print_row(cell)
+
+    if mode == 'direct':
+        for concurrency in args.concurrency:
+            runners, close = direct_runners(args, concurrency)
+            try:
+                await measure(runners, concurrency)
+            finally:
+                close()
+        return cells
+
+    from contextlib import AsyncExitStack
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    port = args.port or free_port()
+    server = await start_server(port, args.server_log, args.server_workers)
+    try:
+        for concurrency in args.concurrency:
+            async with AsyncExitStack() as stack:
+                # One session per worker, as separate clients would connect
+                runners = []
+                for _ in range(concurrency):
+                    read, write, _ = await stack.enter_async_context(streamablehttp_client(f'http://127.0.0.1:{port}/mcp'))
+                    session = await stack.enter_async_context(ClientSession(read, write))
+                    await session.initialize()
+                    runners.append(mcp_runner(session))
+                await measure(runners, concurrency)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+    return cells
+
+
+def mcp_runner(session: Any) -> Runner:
+    """Execute function calling the execute_code tool over an initialized ClientSession"""
+    async def run(code: str, language: str, input_data: str, client_id: str) -> Dict[str, Any]:
+        response = await session.call_tool('execute_code', {
+            'code': code, 'language': language, 'input_data': input_data, 'deterministic': False
+        })
+        if response.isError:
+            return {'success': False, 'error': response.content[0].text if response.content else 'tool error'}
+        return json.loads(response.content[0].text)
+    return run
+
+
+def _ms(value: Optional[float]) -> str:
+    return '-' if value is None else f'{value * 1000:.1f}'
+
+
+def print_row(cell: Dict[str, Any]) -> None:
+    latency = cell['latency']
+    phases = ' '.join(f"{phase}={_ms(cell['phases'].get(phase, {}).get('mean'))}" for phase in PHASES)
+    print(f"{cell['mode']:<6} c={cell['concurrency']:<3} {cell['workload']:<8} {cell['language']:<10} "
+          f"p50={_ms(latency['p50'])} p95={_ms(latency['p95'])} p99={_ms(latency['p99'])} ms  "
+          f"{cell['throughput_rps']} req/s  errors={cell['errors']}  [{phases} ms]", flush=True)
+
+
+def compare(cells: List[Dict[str, Any]], baseline_path: str) -> None:
+    """Print p50/p95 latency and throughput changes against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = {
+            (c['mode'], c['concurrency'], c['workload'], c['language']): c for c in json.load(f)['results']
+        }
+
+    print(f'\nChange vs {baseline_path} (negative latency / positive throughput is better):')
+    for cell in cells:
+        old = baseline.get((cell['mode'], cell['concurrency'], cell['workload'], cell['language']))
+        if old is None:
+            continue
+
+        def delta(new: Optional[float], before: Optional[float]) -> str:
+            if not new or not before:
+                return '-'
+            return f'{(new - before) / before * 100:+.1f}%'
+
+        print(f"{cell['mode']:<6} c={cell['concurrency']:<3} {cell['workload']:<8} {cell['language']:<10} "
+              f"p50 {delta(cell['latency']['p50'], old['latency']['p50'])}  "
+              f"p95 {delta(cell['latency']['p95'], old['latency']['p95'])}  "
+              f"throughput {delta(cell['throughput_rps'], old['throughput_rps'])}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    def csv(choices: Optional[List[str]] = None) -> Callable[[str], List[str]]:
+        def parse(value: str) -> List[str]:
+            items = [item.strip() for item in value.split(',') if item.strip()]
+            for item in items:
+                if choices is not None and item not in choices:
+                    raise argparse.ArgumentTypeError(f'{item!r} is not one of {", ".join(choices)}')
+            return items
+        return parse
+
+    parser = argparse.ArgumentParser(description='Benchmark the code executor directly and through its MCP server')
+    parser.add_argument('--mode', choices=MODES + ['both'], default='direct')
+    parser.add_argument('--languages', type=csv(LANGUAGES), default=LANGUAGES)
+    parser.add_argument('--workloads', type=csv(list(WORKLOADS)), default=list(WORKLOADS))
+    parser.add_argument('--concurrency', type=lambda v: [int(x) for x in csv()(v)], default=[1, 4, 16],
+                        help='comma-separated concurrency levels (default: 1,4,16)')
+    parser.add_argument('--iterations', type=int, default=20, help='measured requests per cell')
+    parser.add_argument('--warmup', type=int, default=2, help='unmeasured requests per cell')
+    parser.add_argument('--cold', action='store_true',
+                        help='make every measured source unique so compile caches always miss')
+    parser.add_argument('--timeout', type=int, default=30, help='executor timeout (direct mode)')
+    parser.add_argument('--max-workers', type=int, default=None, help='executor max_workers (direct mode)')
+    parser.add_argument('--java-pool-size', type=int, default=0, help='warm JVM workers (direct mode)')
+    parser.add_argument('--node-pool-size', type=int, default=0, help='warm Node.js workers (direct mode)')
+    parser.add_argument('--python-fork-server', action='store_true', help='use the Python fork server (direct mode)')
+    parser.add_argument('--port', type=int, default=None, help='MCP server port (default: a free port)')
+    parser.add_argument('--server-workers', type=int, default=1,
+                        help='executor processes behind the MCP port; >1 runs executor_supervisor.py (mcp mode)')
+    parser.add_argument('--server-log', default='benchmark_server.log', help='where the MCP server output goes')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON results file')
+    parser.add_argument('--baseline', default=None, help='earlier results file to compare against')
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    languages = available_languages(args.languages)
+    modes = MODES if args.mode == 'both' else [args.mode]
+
+    started = time.time()
+    cells = []
+    for mode in modes:
+        cells.extend(await run_mode(mode, args, languages))
+
+    report = {
+        'started_at': started,
+        'duration': round(time.time() - started, 3),
+        'host': {
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count()
+        },
+        'args': vars(args),
+        'results': cells
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\nSaved {len(cells)} results to {args.output}')
+
+    if args.baseline:
+        compare(cells, args.baseline)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -5,15 +5,40 @@ Supports Python, Java, JavaScript (Node.js), and C++.
 Run with:
     python code_executor_server.py
 """
+import asyncio
+import atexit
 import subprocess
 import tempfile
 import os
+import select
+import selectors
+import shutil
+import signal
+import socket
+import json
+import re
+import base64
+import codecs
+import fcntl
+import hashlib
+import itertools
+import resource
+import threading
 import time
+import traceback
 import logging
-from typing import Dict, Any, Optional, List
+import mmap
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, asynccontextmanager, AsyncExitStack
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Optional, List, Callable, Iterator, AsyncIterator, AsyncContextManager, Awaitable, Tuple, Union
 from pathlib import Path
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import FastMCP, Context
 from pydantic import BaseModel
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -27,268 +52,3076 @@ class CodeSnippet(BaseModel):
 
 mcp = FastMCP("CodeExecutorServer")
 
+# Streaming output sink: awaited with ('stdout' | 'stderr', text chunk)
+OutputCallback = Callable[[str, str], Awaitable[None]]
+
+def _decode_output(data: bytes) -> str:
+    """Decode captured child output the way subprocess text mode would, without failing on bad UTF-8"""
+    return data.decode('utf-8', errors='replace').replace('\r\n', '\n')
+
+class OutputWindow:
+    """
+    Bounded, binary-safe capture of one output stream
+
+    The first max_bytes / 2 bytes go to a head buffer that grows as output arrives, and
+    the rest through a ring buffer holding the last max_bytes / 2, allocated only once
+    the head is full. A program that prints little costs little, and retained memory
+    stays flat no matter how much it prints. Bytes that fall out of the ring are only
+    counted. Nothing is decoded until getvalue().
+    """
+
+    def __init__(self, max_bytes: int):
+        self.head = bytearray()
+        self.head_limit = max_bytes // 2
+        self.ring = None
+        self.ring_size = max_bytes - self.head_limit
+        self.ring_written = 0
+        self.total = 0
+
+    def feed(self, chunk: bytes) -> None:
+        """Copy a chunk read from the stream into the head, then the ring"""
+        view = memoryview(chunk)
+        self.total += len(view)
+        room = min(self.head_limit - len(self.head), len(view))
+        if room > 0:
+            self.head += view[:room]
+            view = view[room:]
+        if not view:
+            return
+        
+        size = self.ring_size
+        if self.ring is None:
+            self.ring = bytearray(size)
+        if size == 0 or len(view) > size:
+            # Only the last ring-sized part of the chunk can survive
+            self.ring_written += len(view) - size
+            view = view[len(view) - size:] if size else view[:0]
+        while view:
+            position = self.ring_written % size
+            count = min(size - position, len(view))
+            self.ring[position:position + count] = view[:count]
+            self.ring_written += count
+            view = view[count:]
+
+    @property
+    def dropped(self) -> int:
+        """Bytes that were read but not retained"""
+        return max(0, self.ring_written - self.ring_size)
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped > 0
+
+    def getbytes(self) -> Tuple[bytes, bytes]:
+        """Retained (head, tail) bytes, tail in stream order"""
+        size = self.ring_size
+        if self.ring is None:
+            tail = b''
+        elif size == 0 or self.ring_written <= size:
+            tail = bytes(self.ring[:self.ring_written])
+        else:
+            position = self.ring_written % size
+            tail = bytes(self.ring[position:]) + bytes(self.ring[:position])
+        return bytes(self.head), tail
+
+    def getvalue(self) -> str:
+        """Decoded capture, with a marker where bytes were dropped"""
+        return self.render(*self.getbytes(), self.dropped)
+
+    @staticmethod
+    def render(head: bytes, tail: bytes, dropped: int) -> str:
+        """Decode a head/tail capture, marking the dropped middle"""
+        if dropped <= 0:
+            return _decode_output(head + tail)
+        return f'{_decode_output(head)}\n... [{dropped} bytes truncated] ...\n{_decode_output(tail)}'
+
+class ExecutionResult(subprocess.CompletedProcess):
+    """CompletedProcess that also carries the child's resource usage"""
+
+    def __init__(self, args: Any, returncode: int, stdout: str, stderr: str,
+                 peak_memory_kb: Optional[int] = None, cpu_time: Optional[float] = None,
+                 truncated: Optional[bool] = None, spawn_time: Optional[float] = None,
+                 run_time: Optional[float] = None):
+        super().__init__(args, returncode, stdout, stderr)
+        self.peak_memory_kb = peak_memory_kb
+        self.cpu_time = cpu_time
+        self.truncated = truncated
+        self.spawn_time = spawn_time
+        self.run_time = run_time
+
+class PhaseTimer:
+    """Accumulates monotonic durations of a job's consecutive phases into a timings dict"""
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self._mark = time.monotonic()
+
+    def lap(self, phase: str) -> None:
+        """Charge the time since the previous lap (or creation) to phase"""
+        now = time.monotonic()
+        self.timings[phase] = self.timings.get(phase, 0.0) + now - self._mark
+        self._mark = now
+
+# resource.setrlimit targets for the keys of LanguageBackend.RESOURCE_LIMITS. max_processes
+# has none: RLIMIT_NPROC counts every process and thread of the user (the server, its pools,
+# anything else running under that uid), not the job's, so it is only enforced as the
+# job cgroup's pids.max
+RLIMITS = {
+    'cpu_seconds': resource.RLIMIT_CPU,
+    'memory_bytes': resource.RLIMIT_AS,
+    'file_size_bytes': resource.RLIMIT_FSIZE,
+    'open_files': resource.RLIMIT_NOFILE
+}
+
+# Signals that mean a resource limit killed the child, and how to report them
+LIMIT_SIGNALS = {
+    signal.SIGXCPU: 'CPU time limit exceeded',
+    signal.SIGXFSZ: 'File size limit exceeded'
+}
+
+def _apply_limits(limits: Dict[str, Optional[int]]) -> None:
+    """setrlimit every configured limit on the current process"""
+    for name, value in limits.items():
+        if value is not None and name in RLIMITS:
+            # A one-second hard margin lets SIGXCPU (reported as such) arrive before SIGKILL
+            hard = value + 1 if name == 'cpu_seconds' else value
+            resource.setrlimit(RLIMITS[name], (value, hard))
+
+def _child_limiter(limits: Dict[str, Optional[int]], cgroup: Optional[str]) -> Callable[[], None]:
+    """Build the preexec_fn that moves the child into its cgroup and applies its rlimits"""
+    procs_file = os.path.join(cgroup, 'cgroup.procs') if cgroup else None
+    
+    def preexec() -> None:
+        if procs_file:
+            fd = os.open(procs_file, os.O_WRONLY)
+            try:
+                os.write(fd, b'0')
+            finally:
+                os.close(fd)
+        _apply_limits(limits)
+    
+    return preexec
+
+async def _reap_child(pid: int) -> Tuple[int, Any]:
+    """Wait for a child without blocking the loop and return (returncode, rusage) from wait4"""
+    if hasattr(os, 'pidfd_open'):
+        loop = asyncio.get_running_loop()
+        pidfd = os.pidfd_open(pid)
+        exited = loop.create_future()
+        loop.add_reader(pidfd, lambda: exited.done() or exited.set_result(None))
+        try:
+            await exited
+        finally:
+            loop.remove_reader(pidfd)
+            os.close(pidfd)
+        _, status, rusage = os.wait4(pid, 0)
+    else:
+        _, status, rusage = await asyncio.to_thread(os.wait4, pid, 0)
+    return os.waitstatus_to_exitcode(status), rusage
+
+@lru_cache(maxsize=None)
+def _toolchain_version(tool: str) -> str:
+    """Return the first line of `<tool> --version` (or `-version`), cached per process"""
+    for flag in ('--version', '-version'):
+        try:
+            result = subprocess.run([tool, flag], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            continue
+        banner = (result.stdout or result.stderr).strip()
+        if result.returncode == 0 and banner:
+            return banner.splitlines()[0]
+    return 'unknown'
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive flock() on path, serializing with other executor processes sharing a directory"""
+    fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        os.close(fd)
+
+class CompileCache:
+    """
+    Content-addressed on-disk cache of compiled artifacts (C++ binaries, Java .class files)
+
+    Each entry is a directory named after a SHA-256 of the source, compiler, flags and
+    toolchain version. Entry recency is tracked through the directory mtime, and the
+    least recently used entries are evicted once the cache grows past max_bytes.
+    Sizing and eviction run on a maintenance thread, and the directory is only scanned
+    when a running size estimate (the last scan plus what this process has stored
+    since) says it is over budget; entries stored by other processes sharing the
+    directory are seen at that scan.
+    """
+
+    STAGING_PREFIX = '.staging-'
+
+    # Eviction frees space down to this fraction of max_bytes, so a full cache is not
+    # rescanned on every store
+    LOW_WATER = 0.9
+
+    def __init__(self, root: str, max_bytes: int = 512 * 1024 * 1024):
+        """
+        Initialize the compile cache
+
+        Args:
+            root (str): Directory holding the cache entries (created if missing)
+            max_bytes (int): Total artifact size kept on disk before LRU eviction
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._bytes = sum(size for _, size, _ in self._entries_on_disk())
+        self._maintenance = ThreadPoolExecutor(max_workers=1, thread_name_prefix='compile-cache')
+
+    @staticmethod
+    def make_key(source: str, compiler: str, flags: List[str], toolchain_version: str) -> str:
+        """Hash everything that influences the produced artifact into a cache key"""
+        digest = hashlib.sha256()
+        for part in (source, compiler, '\0'.join(flags), toolchain_version):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Return the entry directory for key and mark it as recently used, or None on a miss"""
+        entry = self.root / key
+        with self._lock:
+            if entry.is_dir():
+                try:
+                    os.utime(entry)
+                except OSError:
+                    pass
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def contains(self, key: str) -> bool:
+        """Whether key has an entry, without touching it or the hit/miss counters"""
+        return (self.root / key).is_dir()
+
+    def new_staging_dir(self) -> Path:
+        """Create a build directory on the cache filesystem so store() can rename it atomically"""
+        return Path(tempfile.mkdtemp(prefix=self.STAGING_PREFIX, dir=self.root))
+
+    def store(self, key: str, build_dir: Path) -> Path:
+        """
+        Publish a successful build under key
+
+        Args:
+            key (str): Cache key from make_key()
+            build_dir (Path): Staging directory from new_staging_dir() holding the artifacts
+
+        Returns:
+            Path of the published entry (an existing one if another job won the race)
+        """
+        entry = self.root / key
+        try:
+            os.rename(build_dir, entry)
+        except OSError:
+            # Another job published the same key first; keep theirs
+            shutil.rmtree(build_dir, ignore_errors=True)
+            return entry
+        self._maintenance.submit(self._account, key)
+        return entry
+
+    @staticmethod
+    def _entry_size(entry: Path) -> int:
+        return sum(f.stat().st_size for f in entry.rglob('*') if f.is_file())
+
+    def _entries_on_disk(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every published entry"""
+        entries = []
+        for entry in self.root.iterdir():
+            if entry.name.startswith('.') or not entry.is_dir():
+                continue
+            try:
+                entries.append((entry.stat().st_mtime, self._entry_size(entry), entry))
+            except OSError:
+                continue
+        return entries
+
+    def _account(self, key: str) -> None:
+        """Maintenance thread: add a stored entry to the size estimate and evict once it is over budget"""
+        try:
+            self._bytes += self._entry_size(self.root / key)
+            if self._bytes > self.max_bytes:
+                self._evict(keep=key)
+        except OSError as e:
+            logger.warning(f"Compile cache maintenance failed: {e}")
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries until the cache fits in LOW_WATER * max_bytes"""
+        with _file_lock(self.root / '.evict.lock'):
+            entries = self._entries_on_disk()
+            total = sum(size for _, size, _ in entries)
+            
+            entries.sort()
+            for _, size, entry in entries:
+                if total <= self.max_bytes * self.LOW_WATER:
+                    break
+                if entry.name == keep:
+                    continue
+                shutil.rmtree(entry, ignore_errors=True)
+                total -= size
+                logger.info(f"Evicted compile cache entry {entry.name[:12]} ({size} bytes)")
+            self._bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current on-disk footprint"""
+        entries = [e for e in self.root.iterdir() if e.is_dir() and not e.name.startswith('.')]
+        return {
+            'directory': str(self.root),
+            'entries': len(entries),
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+class ResultCache:
+    """
+    In-memory memo of execution results for deterministic programs
+
+    Entries are keyed by a SHA-256 of the code, language, stdin and toolchain identity,
+    expire ttl seconds after they were stored, and are evicted least recently used
+    first once their estimated size grows past max_bytes.
+    """
+
+    # Rough per-entry overhead of the key, the dict and its small values
+    ENTRY_OVERHEAD = 512
+
+    def __init__(self, ttl: float = 300.0, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the result cache
+
+        Args:
+            ttl (float): Seconds a stored result may be served
+            max_bytes (int): Estimated memory budget before LRU eviction
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._entries: 'OrderedDict[str, Tuple[float, int, Dict[str, Any]]]' = OrderedDict()
+
+    @staticmethod
+    def make_key(code: str, language: str, input_data: str, toolchain: str) -> str:
+        """Hash everything that determines a deterministic program's result into a cache key"""
+        digest = hashlib.sha256()
+        for part in (code, language, input_data, toolchain):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the stored result flagged cached=True, or None if absent or expired"""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry[0] > self.ttl:
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        stored_at, _, result = entry
+        return {**result, 'cached': True, 'cache_age': round(time.monotonic() - stored_at, 3)}
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result, evicting least recently used entries to stay within max_bytes"""
+        size = self.ENTRY_OVERHEAD + sum(
+            len(value) for value in result.values() if isinstance(value, str)
+        )
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+
+        self._entries[key] = (time.monotonic(), size, dict(result))
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        """Remove one entry and its size from the running total"""
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current memory footprint"""
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed
+        }
+
+class SharedResultCache(ResultCache):
+    """
+    ResultCache kept in a directory so every executor process on the host shares it
+
+    Each entry is a JSON file named after its key, written to a staging file and
+    renamed into place so readers never see a partial entry. The stored wall-clock time
+    inside the file bounds its age, the file mtime tracks recency, and the least
+    recently used entries are removed once the directory grows past max_bytes. Writes
+    and eviction run on a writer thread, and the directory is only scanned when a
+    running size estimate (the last scan plus what this process has written since)
+    says it is over budget. Hit and miss counters are per process.
+    """
+
+    STAGING_PREFIX = '.staging-'
+
+    # Eviction frees space down to this fraction of max_bytes, so a full cache is not
+    # rescanned on every write
+    LOW_WATER = 0.9
+
+    def __init__(self, root: str, ttl: float = 300.0, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the shared result cache
+
+        Args:
+            root (str): Directory holding the entries (created if missing)
+            ttl (float): Seconds a stored result may be served
+            max_bytes (int): Total entry size kept on disk before LRU eviction
+        """
+        super().__init__(ttl=ttl, max_bytes=max_bytes)
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.bytes = sum(size for _, size, _ in self._entries_on_disk())
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='result-cache')
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the stored result flagged cached=True, or None if absent or expired"""
+        entry = self.root / key
+        try:
+            with open(entry, 'rb') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        
+        age = time.time() - stored['stored_at']
+        if age > self.ttl:
+            entry.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        self.hits += 1
+        return {**stored['result'], 'cached': True, 'cache_age': round(age, 3)}
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a result in the background; the write and any eviction run on the writer thread"""
+        payload = json.dumps({'stored_at': time.time(), 'result': result}).encode('utf-8')
+        if len(payload) > self.max_bytes:
+            return
+        self._writer.submit(self._write, key, payload)
+
+    def _write(self, key: str, payload: bytes) -> None:
+        """Writer thread: publish one entry and evict once the size estimate is over budget"""
+        try:
+            fd, staging = tempfile.mkstemp(prefix=self.STAGING_PREFIX, dir=self.root)
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(payload)
+                os.replace(staging, self.root / key)
+            except OSError:
+                Path(staging).unlink(missing_ok=True)
+                raise
+            self.bytes += len(payload)
+            if self.bytes > self.max_bytes:
+                self._evict(keep=key)
+        except OSError as e:
+            logger.warning(f"Shared result cache write failed: {e}")
+
+    def _entries_on_disk(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every published entry"""
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.name.startswith('.'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        return entries
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries until the directory fits in LOW_WATER * max_bytes"""
+        with _file_lock(self.root / '.evict.lock'):
+            entries = self._entries_on_disk()
+            total = sum(size for _, size, _ in entries)
+            
+            entries.sort()
+            for _, size, entry in entries:
+                if total <= self.max_bytes * self.LOW_WATER:
+                    break
+                if entry.name == keep:
+                    continue
+                entry.unlink(missing_ok=True)
+                total -= size
+            self.bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current on-disk footprint"""
+        entries = self._entries_on_disk()
+        return {
+            'directory': str(self.root),
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypassed': self.bypassed
+        }
+
+class InputBlob:
+    """A stdin payload kept in an InputStore, handed to runs by reference instead of as a string"""
+
+    def __init__(self, ref: str, path: Path, size: int):
+        self.ref = ref
+        self.path = path
+        self.size = size
+
+    def view(self) -> memoryview:
+        """
+        Read-only view of the payload backed by a memory map, so it is paged in from the
+        file as it is written to a child instead of being copied into server memory.
+        The mapping is released once the last view into it is dropped.
+        """
+        if self.size == 0:
+            return memoryview(b'')
+        with open(self.path, 'rb') as f:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+# What a run reads on stdin: literal text, or a stored input by reference
+StdinData = Union[str, InputBlob]
+
+def _stdin_bytes(data: StdinData) -> Union[bytes, memoryview]:
+    """Bytes to write to a child's stdin"""
+    return data.view() if isinstance(data, InputBlob) else data.encode('utf-8')
+
+class InputTooLarge(Exception):
+    """Raised by InputStore for an input over its max_input_bytes"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f'Input of {size} bytes exceeds the {limit} byte limit')
+        self.size = size
+        self.limit = limit
+
+class InputStore:
+    """
+    Content-addressed on-disk store of large program inputs
+
+    Each input is a file named after the SHA-256 of its bytes (its input_ref), so a
+    client can compute the ref locally and upload an input only once. Recency is
+    tracked through the file mtime, and the least recently used inputs are removed
+    once the store grows past max_bytes. A single input may be at most
+    max_input_bytes (never more than max_bytes), so one upload cannot flush the rest
+    of the store. As in SharedResultCache, the directory is only scanned for eviction
+    when a running size estimate says it is over budget.
+    """
+
+    STAGING_PREFIX = '.staging-'
+    REF_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+    # Eviction frees space down to this fraction of max_bytes, so a full store is not
+    # rescanned on every upload
+    LOW_WATER = 0.9
+
+    def __init__(self, root: str, max_bytes: int = 1024 * 1024 * 1024, max_input_bytes: int = 256 * 1024 * 1024):
+        """
+        Initialize the input store
+
+        Args:
+            root (str): Directory holding the inputs (created if missing)
+            max_bytes (int): Total input size kept on disk before LRU eviction
+            max_input_bytes (int): Largest single input accepted
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_input_bytes = min(max_input_bytes, max_bytes)
+        self.uploads = 0
+        self.rejected = 0
+        self.deduplicated = 0
+        self._lock = threading.Lock()
+        self.bytes = sum(size for _, size, _ in self._entries_on_disk())
+
+    @staticmethod
+    def make_ref(data: bytes) -> str:
+        """The input_ref of a payload: hex SHA-256 of its bytes"""
+        return hashlib.sha256(data).hexdigest()
+
+    def get(self, ref: str) -> Optional[InputBlob]:
+        """Return the stored input for ref and mark it as recently used, or None if unknown"""
+        if not self.REF_PATTERN.fullmatch(ref):
+            return None
+        path = self.root / ref
+        try:
+            os.utime(path)
+            return InputBlob(ref, path, path.stat().st_size)
+        except OSError:
+            return None
+
+    def check_size(self, size: int) -> None:
+        """
+        Reject an input (or an upload that has grown) past max_input_bytes
+
+        Raises:
+            InputTooLarge: size is over the limit
+        """
+        if size > self.max_input_bytes:
+            self.rejected += 1
+            raise InputTooLarge(size, self.max_input_bytes)
+
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """
+        Store a payload; returns its ref and whether it was new
+
+        Raises:
+            InputTooLarge: The payload is over max_input_bytes
+        """
+        self.check_size(len(data))
+        staging = self.new_staging_file()
+        with open(staging, 'wb') as f:
+            f.write(data)
+        return self.commit(staging, self.make_ref(data))
+
+    def new_staging_file(self) -> Path:
+        """Create an empty file on the store's filesystem for an upload in progress"""
+        fd, path = tempfile.mkstemp(prefix=self.STAGING_PREFIX, dir=self.root)
+        os.close(fd)
+        return Path(path)
+
+    def commit(self, staging: Path, ref: str) -> Tuple[str, bool]:
+        """
+        Publish a fully written staging file under ref
+
+        Args:
+            staging (Path): File from new_staging_file()
+            ref (str): make_ref() of its contents
+
+        Returns:
+            (ref, stored): stored is False when the input was already present
+
+        Raises:
+            InputTooLarge: The staging file is over max_input_bytes (it is removed)
+        """
+        try:
+            self.check_size(staging.stat().st_size)
+        except InputTooLarge:
+            staging.unlink(missing_ok=True)
+            raise
+        entry = self.root / ref
+        self.uploads += 1
+        if entry.exists():
+            staging.unlink(missing_ok=True)
+            os.utime(entry)
+            self.deduplicated += 1
+            return ref, False
+        size = staging.stat().st_size
+        os.rename(staging, entry)
+        with self._lock:
+            self.bytes += size
+        if self.bytes > self.max_bytes:
+            self._evict(keep=ref)
+        return ref, True
+
+    def _entries_on_disk(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every stored input"""
+        entries = []
+        for entry in os.scandir(self.root):
+            if entry.name.startswith('.'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, Path(entry.path)))
+        return entries
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used inputs until the store fits in LOW_WATER * max_bytes"""
+        with self._lock, _file_lock(self.root / '.evict.lock'):
+            entries = self._entries_on_disk()
+            total = sum(size for _, size, _ in entries)
+            
+            entries.sort()
+            for _, size, entry in entries:
+                if total <= self.max_bytes * self.LOW_WATER:
+                    break
+                if entry.name == keep:
+                    continue
+                # Runs already streaming it keep their mapping of the unlinked file
+                entry.unlink(missing_ok=True)
+                total -= size
+                logger.info(f"Evicted stored input {entry.name[:12]} ({size} bytes)")
+            self.bytes = total
+
+    def stats(self) -> Dict[str, Any]:
+        """Upload counters and current on-disk footprint"""
+        entries = self._entries_on_disk()
+        return {
+            'directory': str(self.root),
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+            'max_bytes': self.max_bytes,
+            'max_input_bytes': self.max_input_bytes,
+            'uploads': self.uploads,
+            'rejected': self.rejected,
+            'deduplicated': self.deduplicated
+        }
+
+class WorkspacePool:
+    """
+    Reusable job working directories on a RAM-backed filesystem
+
+    Stands in for a TemporaryDirectory per job: directories are created up front,
+    leased to one job at a time, emptied in place when returned and handed to the next
+    job, so the hot path does no mkdir/rmtree and never touches a disk.
+
+    Each pool lives in its own pool-* directory under root next to a pool-*.lock file
+    that the owning process keeps flock()ed. A lock that can be taken belongs to a
+    process that died without cleaning up, and its directory is removed when the next
+    pool starts.
+    """
+
+    PREFIX = 'pool-'
+
+    # Directories with no lock file at all are only reclaimed once this old, so a pool
+    # that is still starting up is left alone
+    ORPHAN_GRACE_SECONDS = 60
+
+    def __init__(self, root: Optional[str] = None, size: int = 8):
+        """
+        Initialize the workspace pool
+
+        Args:
+            root (str): Directory shared by all pools (default: /dev/shm/mcp_code_executor
+                when /dev/shm is writable and not noexec, else under the system temp directory)
+            size (int): Workspaces created up front and kept idle between jobs
+        """
+        self.root = Path(root or self.default_root())
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.size = size
+        self.leases = 0
+        self.discarded = 0
+        self.reclaimed = self._reclaim_leaked()
+        self._lock_fd, self.directory = self._claim()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._idle = deque(self._new_workspace() for _ in range(size))
+        atexit.register(self.close)
+
+    @staticmethod
+    def default_root() -> str:
+        """/dev/shm when it is writable and allows exec, else the system temp directory"""
+        if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+            # Compiled binaries run from the workspace, so a noexec tmpfs is no use
+            if not os.statvfs('/dev/shm').f_flag & os.ST_NOEXEC:
+                return '/dev/shm/mcp_code_executor'
+        return os.path.join(tempfile.gettempdir(), 'mcp_code_executor', 'workspaces')
+
+    def _claim(self) -> Tuple[int, Path]:
+        """Create and lock this pool's directory; returns the lock fd and the directory"""
+        while True:
+            lock_path = self.root / f'{self.PREFIX}{os.getpid()}-{os.urandom(4).hex()}.lock'
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_RDWR, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                # A concurrent _reclaim_leaked() may have locked and unlinked the file first
+                if os.stat(lock_path).st_ino == os.fstat(fd).st_ino:
+                    directory = lock_path.with_suffix('')
+                    directory.mkdir()
+                    return fd, directory
+            except OSError:
+                pass
+            os.close(fd)
+
+    def _reclaim_leaked(self) -> int:
+        """Remove pools whose owning process is gone; returns how many were removed"""
+        reclaimed = 0
+        for lock_path in self.root.glob(f'{self.PREFIX}*.lock'):
+            try:
+                fd = os.open(lock_path, os.O_RDWR)
+            except OSError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # Still held: the owner is alive
+                os.close(fd)
+                continue
+            try:
+                shutil.rmtree(lock_path.with_suffix(''), ignore_errors=True)
+                lock_path.unlink(missing_ok=True)
+                reclaimed += 1
+            finally:
+                os.close(fd)
+
+        for directory in self.root.glob(f'{self.PREFIX}*'):
+            try:
+                orphaned = (
+                    directory.is_dir()
+                    and not directory.with_suffix('.lock').exists()
+                    and time.time() - directory.stat().st_mtime > self.ORPHAN_GRACE_SECONDS
+                )
+            except OSError:
+                continue
+            if orphaned:
+                shutil.rmtree(directory, ignore_errors=True)
+                reclaimed += 1
+
+        if reclaimed:
+            logger.info(f"Removed {reclaimed} workspace pool(s) leaked by earlier processes under {self.root}")
+        return reclaimed
+
+    def _new_workspace(self) -> Path:
+        """Create one more workspace directory in this pool"""
+        workspace = self.directory / f'ws-{next(self._ids)}'
+        workspace.mkdir()
+        return workspace
+
+    @contextmanager
+    def lease(self) -> Iterator[str]:
+        """Borrow an empty workspace for the duration of the block (a drop-in for TemporaryDirectory)"""
+        with self._lock:
+            workspace = self._idle.popleft() if self._idle else None
+            self.leases += 1
+        if workspace is None:
+            workspace = self._new_workspace()
+        try:
+            yield str(workspace)
+        finally:
+            self._release(workspace)
+
+    def _release(self, workspace: Path) -> None:
+        """Empty a returned workspace and keep it for reuse, or remove it if that fails"""
+        try:
+            with os.scandir(workspace) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        shutil.rmtree(entry.path)
+                    else:
+                        os.unlink(entry.path)
+        except OSError:
+            # e.g. the job chmod()ed something; start that slot over from scratch
+            with self._lock:
+                self.discarded += 1
+            shutil.rmtree(workspace, ignore_errors=True)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append(workspace)
+                return
+        workspace.rmdir()
+
+    def close(self) -> None:
+        """Remove this pool's directory and release its lock"""
+        if self._lock_fd is None:
+            return
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.with_suffix('.lock').unlink(missing_ok=True)
+        os.close(self._lock_fd)
+        self._lock_fd = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool location, occupancy and lifetime counters"""
+        return {
+            'directory': str(self.directory),
+            'size': self.size,
+            'idle': len(self._idle),
+            'leases': self.leases,
+            'discarded': self.discarded,
+            'reclaimed_at_startup': self.reclaimed
+        }
+
+class CppToolchain:
+    """
+    g++ invocation for the C++ path: compile profiles, precompiled headers and linker choice
+
+    A profile names a set of optimization flags chosen per request. Sources whose
+    leading #include block covers one of HEADER_SETS are compiled with -include of a
+    precompiled header (PCH) for that set. A PCH is specific to the compiler version and
+    profile flags. The first source that needs one starts building it in the background
+    at the lowest CPU priority and compiles without it, so no request ever waits for a
+    PCH. The linker is the
+    fastest of LINKERS that g++ accepts, falling back to the system default.
+    """
+
+    PROFILES = {
+        'fast-compile': ['-O0'],
+        'fast-run': ['-O2']
+    }
+    DEFAULT_PROFILE = 'fast-compile'
+
+    BASE_FLAGS = ['-pipe']
+
+    # Tried in order; the first one that matches a source's includes is used
+    HEADER_SETS = {
+        'bits-stdc++': ['bits/stdc++.h'],
+        'io-containers': ['iostream', 'string', 'vector'],
+        'iostream': ['iostream']
+    }
+
+    # Fastest first, as accepted by g++ -fuse-ld=
+    LINKERS = ['mold', 'lld', 'gold']
+
+    INCLUDE_PATTERN = re.compile(r'#\s*include\s*<([^>]+)>\s*(//.*)?$')
+
+    PCH_BUILD_TIMEOUT = 300
+
+    def __init__(self, pch_root: str, compiler: str = 'g++'):
+        """
+        Initialize the toolchain
+
+        Args:
+            pch_root (str): Directory where precompiled headers are kept
+            compiler (str): C++ compiler executable
+        """
+        self.compiler = compiler
+        self.pch_root = Path(pch_root)
+        self.pch_root.mkdir(parents=True, exist_ok=True)
+        self.pch_uses = 0
+        self._pch_builds: Dict[str, 'asyncio.Future[None]'] = {}
+        self._linker: Optional[List[str]] = None
+
+    def compile_flags(self, profile: str) -> List[str]:
+        """Flags that affect code generation (and so must match between a PCH and its users)"""
+        return [*self.BASE_FLAGS, *self.PROFILES[profile]]
+
+    def flags(self, profile: str) -> List[str]:
+        """Full flag set for compiling and linking a program under profile"""
+        return [*self.compile_flags(profile), *self.linker_flags()]
+
+    def linker_flags(self) -> List[str]:
+        """-fuse-ld= for the fastest linker g++ can drive here, probed once (by CppBackend at startup)"""
+        if self._linker is None:
+            self._linker = []
+            for linker in self.LINKERS:
+                with tempfile.TemporaryDirectory() as temp_dir:
+                    probe = subprocess.run(
+                        [self.compiler, f'-fuse-ld={linker}', '-x', 'c++', '-', '-o', os.path.join(temp_dir, 'probe')],
+                        input='int main() { return 0; }',
+                        capture_output=True,
+                        text=True
+                    )
+                if probe.returncode == 0:
+                    self._linker = [f'-fuse-ld={linker}']
+                    logger.info(f"Linking C++ programs with {linker}")
+                    break
+        return self._linker
+
+    def match_header_set(self, code: str) -> Optional[str]:
+        """
+        Name of the header set a PCH can stand in for, or None
+
+        Only the leading block of #include <...> lines is considered, and only when no
+        other directive (#define, #pragma, ...) appears in it, since those could change
+        what the headers mean. A set matches when the block includes all of its headers,
+        so the PCH never brings in a header the source did not ask for.
+        """
+        includes = set()
+        for line in code.splitlines():
+            line = line.strip()
+            if not line or line.startswith('//'):
+                continue
+            if not line.startswith('#'):
+                break
+            match = self.INCLUDE_PATTERN.match(line)
+            if match is None:
+                return None
+            includes.add(match.group(1))
+
+        for name, headers in self.HEADER_SETS.items():
+            if includes.issuperset(headers):
+                return name
+        return None
+
+    def pch_flags(self, code: str, profile: str) -> List[str]:
+        """
+        Flags that make a compile of code use a matching PCH
+
+        Returns an empty list when no header set matches or its PCH is not built yet; in
+        the latter case a background build is started.
+        """
+        name = self.match_header_set(code)
+        if name is None:
+            return []
+
+        directory = self._pch_directory(name, profile)
+        if (directory / 'pch.h.gch').exists():
+            self.pch_uses += 1
+            return ['-include', str(directory / 'pch.h')]
+
+        if directory.name not in self._pch_builds:
+            self._pch_builds[directory.name] = asyncio.ensure_future(self._build_pch(name, profile, directory))
+        return []
+
+    def _pch_directory(self, name: str, profile: str) -> Path:
+        """Directory of the PCH for a header set, keyed on everything that invalidates it"""
+        digest = hashlib.sha256()
+        for part in (_toolchain_version(self.compiler), *self.compile_flags(profile), *self.HEADER_SETS[name]):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\x00')
+        return self.pch_root / f'{name}-{profile}-{digest.hexdigest()[:16]}'
+
+    async def _build_pch(self, name: str, profile: str, directory: Path) -> None:
+        """Compile the PCH for a header set and publish it with an atomic rename"""
+        directory.mkdir(parents=True, exist_ok=True)
+        header = directory / 'pch.h'
+        header.write_text(''.join(f'#include <{h}>\n' for h in self.HEADER_SETS[name]))
+        staging = directory / f'.pch.h.gch.{os.getpid()}'
+        process = None
+        try:
+            # Outside the executor's process slots, but niced so that jobs keep the CPU
+            process = await asyncio.create_subprocess_exec(
+                self.compiler, *self.compile_flags(profile), '-x', 'c++-header', str(header), '-o', str(staging),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+                preexec_fn=lambda: os.nice(19)
+            )
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout=self.PCH_BUILD_TIMEOUT)
+            if process.returncode == 0:
+                os.rename(staging, directory / 'pch.h.gch')
+                logger.info(f"Built C++ precompiled header {directory.name}")
+            else:
+                logger.warning(f"Building C++ precompiled header {directory.name} failed: {_decode_output(stderr)}")
+        except Exception as e:
+            if process is not None and process.returncode is None:
+                process.kill()
+                await process.wait()
+            logger.warning(f"Building C++ precompiled header {directory.name} failed: {e}")
+        finally:
+            staging.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Compiler, linker, profiles and the PCHs built so far"""
+        return {
+            'compiler': self.compiler,
+            'linker': (self._linker or ['default'])[0].replace('-fuse-ld=', ''),
+            'profiles': {name: self.compile_flags(name) for name in self.PROFILES},
+            'default_profile': self.DEFAULT_PROFILE,
+            'precompiled_headers': sorted(p.parent.name for p in self.pch_root.glob('*/pch.h.gch')),
+            'pch_uses': self.pch_uses
+        }
+
+class _ProtocolWorker:
+    """
+    One long-lived worker process speaking the tab-separated Base64 line protocol
+    documented in JvmWorker.java and NodeWorker.js
+    """
+
+    def __init__(self, cmd: List[str], name: str, control_fds: bool = False,
+                 preexec_fn: Optional[Callable[[], None]] = None):
+        """
+        Start the worker
+
+        Args:
+            cmd (list): Launch command
+            name (str): Worker kind used in error messages ('JVM', 'Node.js')
+            control_fds (bool): Talk over a dedicated pipe pair whose child-side fds are
+                appended to cmd, leaving the child's stdin/stdout to /dev/null, instead of
+                over its stdin/stdout
+            preexec_fn (callable): Run in the child before exec (e.g. to apply rlimits)
+        """
+        self.name = name
+        self.jobs = 0
+        self.healthy = True
+        self._buffer = b''
+        if control_fds:
+            child_in, self._control_in = os.pipe()
+            self._control_out, child_out = os.pipe()
+            try:
+                self.process = subprocess.Popen(
+                    [*cmd, str(child_in), str(child_out)],
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.DEVNULL,
+                    stderr=subprocess.DEVNULL,
+                    pass_fds=(child_in, child_out),
+                    preexec_fn=preexec_fn
+                )
+            finally:
+                os.close(child_in)
+                os.close(child_out)
+        else:
+            self.process = subprocess.Popen(
+                cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                bufsize=0,
+                preexec_fn=preexec_fn
+            )
+            self._control_in = self.process.stdin.fileno()
+            self._control_out = self.process.stdout.fileno()
+
+    def request(self, fields: List[Any], timeout: float) -> List[str]:
+        """
+        Send one command and wait for its reply line
+
+        Raises:
+            subprocess.TimeoutExpired: No reply within timeout (the worker is killed)
+            RuntimeError: The worker exited without replying
+        """
+        line = '\t'.join(
+            base64.b64encode(f if isinstance(f, bytes) else f.encode('utf-8')).decode('ascii') for f in fields[1:]
+        )
+        data = memoryview(f'{fields[0]}\t{line}\n'.encode('ascii'))
+        try:
+            while data:
+                data = data[os.write(self._control_in, data):]
+        except OSError as e:
+            self.healthy = False
+            raise RuntimeError(f'{self.name} worker is not accepting jobs: {e}')
+        
+        deadline = time.monotonic() + timeout
+        while b'\n' not in self._buffer:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self._control_out], [], [], remaining)[0]:
+                self.kill()
+                raise subprocess.TimeoutExpired(self.process.args, timeout)
+            chunk = os.read(self._control_out, 65536)
+            if not chunk:
+                self.healthy = False
+                raise RuntimeError(f'{self.name} worker exited unexpectedly with code {self.process.wait()}')
+            self._buffer += chunk
+        
+        reply, self._buffer = self._buffer.split(b'\n', 1)
+        return reply.decode('ascii').split('\t')
+
+    def kill(self) -> None:
+        self.healthy = False
+        if self.process.poll() is None:
+            self.process.kill()
+        self.process.wait()
+        if self.process.stdin is None:
+            for fd in (self._control_in, self._control_out):
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+class _WarmWorkerPool(ABC):
+    """
+    Leasing and recycling shared by the pools of long-lived worker processes
+
+    A job borrows an idle worker (or a freshly started one when none is idle), and the
+    worker goes back to the pool afterwards unless it served max_jobs_per_worker jobs,
+    exited, or was marked unhealthy by the job.
+    """
+
+    def __init__(self, size: int, max_jobs_per_worker: int):
+        """
+        Initialize the pool bookkeeping
+
+        Args:
+            size (int): Number of worker processes (also the job concurrency)
+            max_jobs_per_worker (int): Jobs served before a worker is recycled
+        """
+        self.size = size
+        self.max_jobs_per_worker = max_jobs_per_worker
+        self.recycled = 0
+        self._slots = threading.Semaphore(size)
+        self._idle: List[_ProtocolWorker] = []
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _new_worker(self) -> _ProtocolWorker:
+        """Start one worker process"""
+
+    @contextmanager
+    def _lease(self) -> Iterator[_ProtocolWorker]:
+        """Borrow a worker, spawning a replacement if none is idle, and recycle it when needed"""
+        with self._slots:
+            with self._lock:
+                worker = self._idle.pop() if self._idle else None
+            if worker is None:
+                worker = self._new_worker()
+            try:
+                yield worker
+            finally:
+                worker.jobs += 1
+                reusable = worker.healthy and worker.jobs < self.max_jobs_per_worker and worker.process.poll() is None
+                with self._lock:
+                    # Warm-up may still be filling the pool; never keep more than size idle workers
+                    if reusable and len(self._idle) < self.size:
+                        self._idle.append(worker)
+                        worker = None
+                if worker is not None:
+                    worker.kill()
+                    self.recycled += 1
+
+    @staticmethod
+    def _render_output(reply: List[str], max_output_bytes: int) -> Tuple[List[str], bool]:
+        """
+        Decode the stdout/stderr fields (reply[2:4]) and dropped counts (reply[5:7]) of a
+        DONE reply into rendered streams, as an OutputWindow of max_output_bytes would
+
+        Returns:
+            ([stdout, stderr], truncated)
+        """
+        head_limit = max_output_bytes // 2
+        streams = []
+        for field, dropped in zip(reply[2:4], reply[5:7]):
+            data = base64.b64decode(field)
+            streams.append(OutputWindow.render(data[:head_limit], data[head_limit:], int(dropped)))
+        return streams, any(int(dropped) > 0 for dropped in reply[5:7])
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size and recycling counters"""
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'max_jobs_per_worker': self.max_jobs_per_worker,
+            'recycled': self.recycled
+        }
+
+    def close(self) -> None:
+        """Stop the idle workers (leased ones stop when their job returns them)"""
+        with self._lock:
+            workers, self._idle = self._idle, []
+            self.size = 0
+        for worker in workers:
+            worker.kill()
+
+class JvmWorkerPool(_WarmWorkerPool):
+    """
+    Pool of long-lived JVMs that compile (javax.tools) and run Java submissions in-process
+
+    Each run loads the compiled classes through a fresh classloader and gets its own
+    System.in/out/err, so a warm JVM can serve many jobs without paying startup cost.
+    A worker is replaced after max_jobs_per_worker jobs, and also after a timeout, a
+    System.exit(), a crash, or a job that leaves threads running.
+    """
+
+    WORKER_SOURCE = Path(__file__).with_name('JvmWorker.java')
+    # Full tiered compilation is kept (no TieredStopAtLevel=1): a worker outlives many jobs,
+    # so there is no startup to shorten, and C2 is what CPU-bound submissions need
+    JVM_FLAGS = ['-XX:+UseSerialGC', '-Xshare:auto']
+
+    def __init__(self, size: int, max_jobs_per_worker: int = 100, build_root: Optional[str] = None):
+        """
+        Initialize the pool and start warming its workers in the background
+
+        Args:
+            size (int): Number of JVM processes (also the Java job concurrency)
+            max_jobs_per_worker (int): Jobs served before a worker is recycled
+            build_root (str): Where JvmWorker.class is compiled (default: system temp dir)
+        """
+        super().__init__(size, max_jobs_per_worker)
+        self.build_root = Path(build_root or tempfile.gettempdir()) / 'mcp_code_executor' / 'jvm_worker'
+        self._cmd: Optional[List[str]] = None
+        threading.Thread(target=self._warm_up, name='jvm-pool-warmup', daemon=True).start()
+
+    def _worker_cmd(self) -> List[str]:
+        """Compile JvmWorker.java once per source revision and return the launch command"""
+        with self._lock:
+            if self._cmd is None:
+                source = self.WORKER_SOURCE.read_bytes()
+                classes_dir = self.build_root / hashlib.sha256(source).hexdigest()[:16]
+                if not (classes_dir / 'JvmWorker.class').exists():
+                    classes_dir.mkdir(parents=True, exist_ok=True)
+                    subprocess.run(
+                        ['javac', '-d', str(classes_dir), str(self.WORKER_SOURCE)],
+                        capture_output=True,
+                        text=True,
+                        check=True
+                    )
+                self._cmd = ['java', *self.JVM_FLAGS, '-cp', str(classes_dir), 'JvmWorker']
+            return self._cmd
+
+    def _new_worker(self) -> _ProtocolWorker:
+        return _ProtocolWorker(self._worker_cmd(), 'JVM')
+
+    def _warm_up(self) -> None:
+        """Start every worker and push a trivial class through the compiler to load javac"""
+        try:
+            workers = [self._new_worker() for _ in range(self.size)]
+            with tempfile.TemporaryDirectory() as temp_dir:
+                for worker in workers:
+                    worker.request(['COMPILE', 'Warmup', 'public class Warmup {}', temp_dir], timeout=60)
+            with self._lock:
+                self._idle.extend(workers)
+            logger.info(f"JVM worker pool ready with {self.size} workers")
+        except Exception as e:
+            logger.warning(f"JVM worker pool warm-up failed: {e}")
+
+    def compile(self, class_name: str, source: str, out_dir: str, timeout: float) -> subprocess.CompletedProcess:
+        """Compile source into out_dir with the in-process compiler; mirrors subprocess.run(['javac', ...])"""
+        with self._lease() as worker:
+            reply = worker.request(['COMPILE', class_name, source, out_dir], timeout)
+        stderr = base64.b64decode(reply[1]).decode('utf-8', errors='replace') if len(reply) > 1 else ''
+        return subprocess.CompletedProcess(['javax.tools', class_name], 0 if reply[0] == 'OK' else 1, '', stderr)
+
+    def run(self, class_dir: str, class_name: str, input_data: Union[str, bytes], timeout: float,
+            max_output_bytes: int = 8 * 1024 * 1024) -> ExecutionResult:
+        """
+        Run class_name's main() from class_dir in a warm JVM; mirrors subprocess.run(['java', ...])
+
+        The worker keeps the head and tail halves of max_output_bytes per stream, as an
+        OutputWindow would, and reports how many bytes it dropped in between.
+        """
+        with self._lease() as worker:
+            reply = worker.request(['RUN', class_dir, class_name, input_data, str(max_output_bytes)], timeout)
+            if reply[0] != 'DONE':
+                worker.healthy = False
+                raise RuntimeError(f'JVM worker protocol error: {reply[0]}')
+            
+            if reply[1] == '-':
+                # The submission called System.exit(); the JVM's own exit status is the program's
+                worker.healthy = False
+                returncode = worker.process.wait(timeout=timeout)
+            else:
+                returncode = int(reply[1])
+            worker.healthy = worker.healthy and reply[4] == '0'
+        
+        streams, truncated = self._render_output(reply, max_output_bytes)
+        return ExecutionResult(['java', class_name], returncode, *streams, truncated=truncated)
+
+class NodeWorkerPool(_WarmWorkerPool):
+    """
+    Pool of long-lived Node.js processes that run JavaScript submissions in worker_threads
+
+    Each job runs as the main module of its own isolate with its own process.stdin,
+    stdout and stderr, a heap capped at heap_mb, and a timeout enforced by terminating
+    the isolate; jobs never share globals or module state. Every process keeps the next
+    isolate started ahead of time, so a job does not wait for Node.js or V8 to boot. A
+    process is replaced after max_jobs_per_worker jobs or when it stops answering.
+    """
+
+    WORKER_SCRIPT = Path(__file__).with_name('NodeWorker.js')
+
+    # Time a process gets past the job timeout to terminate the isolate and reply before it is killed
+    REPLY_GRACE_SECONDS = 5.0
+
+    def __init__(self, size: int, max_jobs_per_worker: int = 100, heap_mb: int = 512,
+                 limits: Optional[Dict[str, Optional[int]]] = None):
+        """
+        Initialize the pool and start its workers in the background
+
+        Args:
+            size (int): Number of Node.js processes (also the JavaScript job concurrency)
+            max_jobs_per_worker (int): Jobs served before a process is recycled
+            heap_mb (int): Old-generation heap cap of every job's isolate
+            limits (dict): Resource limits (LanguageBackend.RESOURCE_LIMITS layout) applied to each
+                process; cpu_seconds is skipped since a process outlives many jobs
+        """
+        super().__init__(size, max_jobs_per_worker)
+        self.heap_mb = heap_mb
+        self.limits = {name: value for name, value in (limits or {}).items() if name != 'cpu_seconds'}
+        threading.Thread(target=self._warm_up, name='node-pool-warmup', daemon=True).start()
+
+    def _new_worker(self) -> _ProtocolWorker:
+        return _ProtocolWorker(['node', str(self.WORKER_SCRIPT), str(self.heap_mb)], 'Node.js',
+                               control_fds=True, preexec_fn=_child_limiter(self.limits, None))
+
+    def _warm_up(self) -> None:
+        """Start every worker (each boots its first isolate right away)"""
+        try:
+            workers = [self._new_worker() for _ in range(self.size)]
+            with self._lock:
+                self._idle.extend(workers)
+            logger.info(f"Node.js worker pool ready with {self.size} workers")
+        except Exception as e:
+            logger.warning(f"Node.js worker pool warm-up failed: {e}")
+
+    def run(self, script: str, input_data: StdinData, timeout: float,
+            max_output_bytes: int = 8 * 1024 * 1024) -> ExecutionResult:
+        """
+        Run script in a fresh isolate of a warm process; mirrors subprocess.run(['node', script], timeout=...)
+
+        Stored inputs are streamed from their file by the worker rather than sent inline.
+        The worker keeps the head and tail halves of max_output_bytes per stream, as an
+        OutputWindow would, and reports how many bytes it dropped in between.
+
+        Raises:
+            subprocess.TimeoutExpired: The job ran past timeout (its isolate is terminated)
+        """
+        if isinstance(input_data, InputBlob):
+            stdin, stdin_file = b'', str(input_data.path)
+        else:
+            stdin, stdin_file = input_data, ''
+        
+        with self._lease() as worker:
+            reply = worker.request(
+                ['RUN', script, stdin, stdin_file, str(max_output_bytes), str(int(timeout * 1000))],
+                timeout + self.REPLY_GRACE_SECONDS
+            )
+            if reply[0] != 'DONE':
+                worker.healthy = False
+                raise RuntimeError(f'Node.js worker protocol error: {reply[0]}')
+        
+        if reply[4] == 'timeout':
+            raise subprocess.TimeoutExpired(['node', script], timeout)
+        streams, truncated = self._render_output(reply, max_output_bytes)
+        return ExecutionResult(['node', script], int(reply[1]), *streams, truncated=truncated)
+
+class PythonForkServer:
+    """
+    Client for python_zygote.py, a warm interpreter that forks one child per Python job
+
+    The zygote has already paid interpreter startup and imported common stdlib modules,
+    so a job only costs a fork. Each job gets fresh stdin/stdout/stderr pipes, and a
+    timeout kills the child's process group just like subprocess.run would.
+    """
+
+    ZYGOTE_SCRIPT = Path(__file__).with_name('python_zygote.py')
+
+    def __init__(self, python: str = 'python'):
+        """
+        Initialize the fork server client (the zygote starts on first use)
+
+        Args:
+            python (str): Interpreter used for the zygote, as for the regular python path
+        """
+        self.python = python
+        self.socket_path = os.path.join(tempfile.mkdtemp(prefix='mcp_zygote_'), 'zygote.sock')
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        """(Re)start the zygote and wait for it to listen"""
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            
+            self._process = subprocess.Popen(
+                [self.python, str(self.ZYGOTE_SCRIPT), self.socket_path],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True
+            )
+            if self._process.stdout.readline().strip() != 'READY':
+                raise RuntimeError(f'Python fork server failed to start (exit code {self._process.wait()})')
+            logger.info(f"Python fork server started (pid {self._process.pid})")
+
+    def run(self, script: str, input_data: StdinData, timeout: float,
+            limits: Optional[Dict[str, Optional[int]]] = None,
+            max_output_bytes: int = 8 * 1024 * 1024) -> ExecutionResult:
+        """
+        Run script in a child forked from the zygote; mirrors subprocess.run(['python', script], ...)
+
+        limits are applied with setrlimit in the child, as for spawned programs. Each output
+        stream is captured in an OutputWindow of max_output_bytes.
+
+        Raises:
+            subprocess.TimeoutExpired: The child ran past timeout (it is killed first)
+        """
+        self._ensure_started()
+        
+        stdin_r, stdin_w = os.pipe()
+        out_r, out_w = os.pipe()
+        err_r, err_w = os.pipe()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(self.socket_path)
+            request = json.dumps({'script': script, 'cwd': os.getcwd(), 'limits': limits or {}}).encode('utf-8')
+            socket.send_fds(conn, [request], [stdin_r, out_w, err_w])
+        except BaseException:
+            conn.close()
+            for fd in (stdin_r, stdin_w, out_r, out_w, err_r, err_w):
+                os.close(fd)
+            raise
+        for fd in (stdin_r, out_w, err_w):
+            os.close(fd)
+        
+        try:
+            return self._communicate(conn, stdin_w, out_r, err_r, memoryview(_stdin_bytes(input_data)), script,
+                                     timeout, max_output_bytes)
+        finally:
+            conn.close()
+
+    def _communicate(self, conn: socket.socket, stdin_w: int, out_r: int, err_r: int,
+                     input_bytes: memoryview, script: str, timeout: float, max_output_bytes: int) -> ExecutionResult:
+        """Feed stdin, drain stdout/stderr and collect the exit status, killing the child at the deadline"""
+        deadline = time.monotonic() + timeout
+        outputs = {out_r: OutputWindow(max_output_bytes), err_r: OutputWindow(max_output_bytes)}
+        control = b''
+        pid = None
+        status = None
+        usage = {}
+        
+        selector = selectors.DefaultSelector()
+        os.set_blocking(stdin_w, False)
+        if input_bytes:
+            selector.register(stdin_w, selectors.EVENT_WRITE)
+        else:
+            os.close(stdin_w)
+        selector.register(out_r, selectors.EVENT_READ)
+        selector.register(err_r, selectors.EVENT_READ)
+        selector.register(conn, selectors.EVENT_READ)
+        
+        try:
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Without a pid yet, run() closing conn makes the zygote kill the child
+                    if pid is not None:
+                        try:
+                            os.killpg(pid, signal.SIGKILL)
+                        except ProcessLookupError:
+                            pass
+                    raise subprocess.TimeoutExpired([self.python, script], timeout)
+                
+                for key, _ in selector.select(remaining):
+                    fd = key.fd
+                    if fd == stdin_w:
+                        try:
+                            written = os.write(stdin_w, input_bytes[:65536])
+                        except BrokenPipeError:
+                            written = len(input_bytes)
+                        input_bytes = input_bytes[written:]
+                        if not input_bytes:
+                            selector.unregister(stdin_w)
+                            os.close(stdin_w)
+                    elif fd == conn.fileno():
+                        chunk = conn.recv(4096)
+                        if not chunk:
+                            selector.unregister(conn)
+                            continue
+                        control += chunk
+                        while b'\n' in control:
+                            line, control = control.split(b'\n', 1)
+                            message = json.loads(line)
+                            pid = message.get('pid', pid)
+                            status = message.get('status', status)
+                            usage = message.get('usage', usage)
+                    else:
+                        chunk = os.read(fd, 65536)
+                        if chunk:
+                            outputs[fd].feed(chunk)
+                        else:
+                            selector.unregister(fd)
+        finally:
+            for key in list(selector.get_map().values()):
+                if key.fd == stdin_w:
+                    os.close(stdin_w)
+            selector.close()
+            os.close(out_r)
+            os.close(err_r)
+        
+        if status is None:
+            raise RuntimeError('Python fork server lost the job before it finished')
+        
+        stdout, stderr = (outputs[fd].getvalue() for fd in (out_r, err_r))
+        return ExecutionResult(
+            [self.python, script], status, stdout, stderr,
+            peak_memory_kb=usage.get('peak_memory_kb'), cpu_time=usage.get('cpu_time'),
+            truncated=any(window.truncated for window in outputs.values())
+        )
+
+    def close(self) -> None:
+        """Stop the zygote"""
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                self._process.kill()
+                self._process.wait()
+
+class ExecutorBusy(Exception):
+    """Raised by JobScheduler when a job cannot even be queued; carries a retry hint"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class JobScheduler:
+    """
+    Bounded, fair job queue in front of the executor
+
+    At most max_running slots are held at once; a job holds one slot per process it
+    runs at a time (a batch or a set of test cases holds several). Further jobs wait in a
+    queue of at most max_queued entries, max_queued_per_client of them from any one
+    client, and are rejected with ExecutorBusy beyond that instead of piling up. When
+    slots free up the next job is picked by:
+      1. priority: CHEAP jobs (interpreted, or compiled with a warm compile cache) go
+         before COLD compiles, unless the cold job has already waited aging_seconds
+      2. fair share: the client holding the fewest slots, then the one served least
+         recently
+      3. arrival order
+    The picked job waits until enough slots are free for it, so wide jobs are not
+    starved by a stream of narrow ones.
+    """
+
+    CHEAP = 0
+    COLD = 1
+
+    # Clients remembered for the "served least recently" tie-break
+    MAX_TRACKED_CLIENTS = 4096
+
+    def __init__(self, max_running: int, max_queued: int = 64, max_queued_per_client: int = 16,
+                 aging_seconds: float = 2.0):
+        """
+        Initialize the scheduler
+
+        Args:
+            max_running (int): Jobs allowed to run at once
+            max_queued (int): Jobs allowed to wait for a slot before new ones are rejected
+            max_queued_per_client (int): Share of the queue one client may occupy
+            aging_seconds (float): Wait after which a COLD job competes as CHEAP
+        """
+        self.max_running = max_running
+        self.max_queued = max_queued
+        self.max_queued_per_client = max_queued_per_client
+        self.aging_seconds = aging_seconds
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._waiting: List[Dict[str, Any]] = []
+        self._running_by_client: Dict[str, int] = {}
+        self._last_served: Dict[str, int] = {}
+        self._arrivals = itertools.count()
+        self._grants = itertools.count()
+        self._wait_times = deque(maxlen=1024)
+        self._service_times = deque(maxlen=256)
+
+    @asynccontextmanager
+    async def slot(self, client_id: str, priority: int, slots: int = 1) -> AsyncIterator[float]:
+        """
+        Hold running slots for the duration of the block
+
+        Args:
+            client_id (str): Identity used for fair sharing
+            priority (int): CHEAP or COLD
+            slots (int): Processes the job runs at once (capped at max_running)
+
+        Yields:
+            Seconds the job spent queued
+
+        Raises:
+            ExecutorBusy: The queue, or this client's share of it, is full
+        """
+        enqueued = time.monotonic()
+        slots = max(1, min(slots, self.max_running))
+        if self.running + slots <= self.max_running and not self._waiting:
+            self._grant(client_id, slots)
+        else:
+            queued_by_client = sum(1 for waiter in self._waiting if waiter['client'] == client_id)
+            if len(self._waiting) >= self.max_queued or queued_by_client >= self.max_queued_per_client:
+                self.rejected += 1
+                retry_after = self.retry_after()
+                logger.warning(f"Rejecting job from {client_id}: {len(self._waiting)} queued, "
+                               f"{self.running} of {self.max_running} slots busy")
+                raise ExecutorBusy(
+                    f'Server busy: {self.running} of {self.max_running} slots busy and {len(self._waiting)} jobs queued '
+                    f'({queued_by_client} of them yours), retry after {retry_after}s',
+                    retry_after
+                )
+
+            waiter = {
+                'client': client_id,
+                'priority': priority,
+                'slots': slots,
+                'arrival': next(self._arrivals),
+                'enqueued': enqueued,
+                'admitted': False,
+                'future': asyncio.get_running_loop().create_future()
+            }
+            self._waiting.append(waiter)
+            try:
+                await waiter['future']
+            except asyncio.CancelledError:
+                # The slot may have been granted just before the cancellation landed
+                if waiter['admitted']:
+                    self._release(client_id, slots)
+                elif waiter in self._waiting:
+                    self._waiting.remove(waiter)
+                raise
+
+        wait_time = time.monotonic() - enqueued
+        self._wait_times.append(wait_time)
+        started = time.monotonic()
+        try:
+            yield wait_time
+        finally:
+            self._service_times.append(time.monotonic() - started)
+            self._release(client_id, slots)
+
+    def _grant(self, client_id: str, slots: int) -> None:
+        """Account running slots to client_id"""
+        self.running += slots
+        self._running_by_client[client_id] = self._running_by_client.get(client_id, 0) + slots
+        self._last_served.pop(client_id, None)
+        self._last_served[client_id] = next(self._grants)
+        if len(self._last_served) > self.MAX_TRACKED_CLIENTS:
+            del self._last_served[next(iter(self._last_served))]
+
+    def _release(self, client_id: str, slots: int) -> None:
+        """Give a job's slots back and hand them to the next waiters"""
+        self.running -= slots
+        self.completed += 1
+        remaining = self._running_by_client.pop(client_id) - slots
+        if remaining:
+            self._running_by_client[client_id] = remaining
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant free slots to waiters in priority, fair-share, arrival order"""
+        now = time.monotonic()
+
+        def rank(waiter: Dict[str, Any]) -> Tuple[int, int, int, int]:
+            aged = now - waiter['enqueued'] >= self.aging_seconds
+            return (
+                self.CHEAP if aged else waiter['priority'],
+                self._running_by_client.get(waiter['client'], 0),
+                self._last_served.get(waiter['client'], -1),
+                waiter['arrival']
+            )
+
+        while self._waiting and self.running < self.max_running:
+            waiter = min(self._waiting, key=rank)
+            if waiter['future'].done():
+                # Cancelled while queued; its task has not run its cleanup yet
+                self._waiting.remove(waiter)
+                continue
+            if self.running + waiter['slots'] > self.max_running:
+                break
+            self._waiting.remove(waiter)
+            self._grant(waiter['client'], waiter['slots'])
+            waiter['admitted'] = True
+            waiter['future'].set_result(None)
+
+    @property
+    def queued(self) -> int:
+        """Jobs currently waiting for a slot"""
+        return len(self._waiting)
+
+    def retry_after(self) -> float:
+        """Rough seconds until a queue position frees up, from recent job durations"""
+        if self._service_times:
+            service_time = sum(self._service_times) / len(self._service_times)
+        else:
+            service_time = 1.0
+        queued_slots = sum(waiter['slots'] for waiter in self._waiting)
+        return round(max(1.0, service_time * (queued_slots + 1) / self.max_running), 1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, occupancy, counters and recent queue wait times"""
+        waits = sorted(self._wait_times)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))], 4) if waits else 0.0
+
+        return {
+            'running': self.running,
+            'max_running': self.max_running,
+            'queued': self.queued,
+            'queued_cold': sum(1 for waiter in self._waiting if waiter['priority'] == self.COLD),
+            'max_queued': self.max_queued,
+            'max_queued_per_client': self.max_queued_per_client,
+            'clients': len(set(self._running_by_client) | {waiter['client'] for waiter in self._waiting}),
+            'completed': self.completed,
+            'rejected': self.rejected,
+            'wait_time': {
+                'mean': round(sum(waits) / len(waits), 4) if waits else 0.0,
+                'p50': percentile(0.5),
+                'p95': percentile(0.95),
+                'max': percentile(1.0)
+            }
+        }
+
+class ExecutorMetrics:
+    """
+    Prometheus-style job metrics for the executor
+
+    Keeps a histogram of seconds per (language, phase), job counters per (language,
+    outcome) and the number of jobs in flight (queued or running). render() produces
+    the text exposition format, together with scheduler and cache figures passed in
+    by the caller.
+    """
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        self.in_flight = 0
+        # (language, phase) -> per-bucket counts (last one is +Inf), sum
+        self._histograms: Dict[Tuple[str, str], Tuple[List[int], List[float]]] = {}
+        self._jobs: Dict[Tuple[str, str], int] = {}
+
+    @contextmanager
+    def track(self) -> Iterator[None]:
+        """Count a job as in flight for the duration of the block"""
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def observe(self, language: str, timings: Dict[str, Optional[float]]) -> None:
+        """Add each phase duration in timings (None entries are skipped) to its histogram"""
+        for phase, seconds in timings.items():
+            if seconds is None:
+                continue
+            counts, total = self._histograms.setdefault((language, phase), ([0] * (len(self.BUCKETS) + 1), [0.0]))
+            index = next((i for i, bound in enumerate(self.BUCKETS) if seconds <= bound), len(self.BUCKETS))
+            counts[index] += 1
+            total[0] += seconds
+
+    def count(self, language: str, outcome: str) -> None:
+        """Count one finished job: outcome is 'success', 'failure', 'busy' or 'cached'"""
+        self._jobs[(language, outcome)] = self._jobs.get((language, outcome), 0) + 1
+
+    def render(self, gauges: Dict[str, float], caches: Dict[str, Tuple[int, int]]) -> str:
+        """
+        Prometheus text exposition of the metrics
+
+        Args:
+            gauges (dict): Extra executor_<name> gauges, e.g. {'job_slots_busy': 2}
+            caches (dict): Cache name -> (hits, misses)
+
+        Returns:
+            str: Metrics in the text format (version 0.0.4)
+        """
+        lines = [
+            '# HELP executor_phase_seconds Time spent in each phase of a job',
+            '# TYPE executor_phase_seconds histogram'
+        ]
+        for (language, phase), (counts, total) in sorted(self._histograms.items()):
+            labels = f'language="{language}",phase="{phase}"'
+            cumulative = 0
+            for bound, count in zip([*map(str, self.BUCKETS), '+Inf'], counts):
+                cumulative += count
+                lines.append(f'executor_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'executor_phase_seconds_sum{{{labels}}} {total[0]:.6f}')
+            lines.append(f'executor_phase_seconds_count{{{labels}}} {cumulative}')
+
+        lines += ['# HELP executor_jobs_total Finished jobs by outcome', '# TYPE executor_jobs_total counter']
+        for (language, outcome), count in sorted(self._jobs.items()):
+            lines.append(f'executor_jobs_total{{language="{language}",outcome="{outcome}"}} {count}')
+
+        lines += ['# HELP executor_jobs_in_flight Jobs queued or running', '# TYPE executor_jobs_in_flight gauge',
+                  f'executor_jobs_in_flight {self.in_flight}']
+        for name, value in gauges.items():
+            lines += [f'# TYPE executor_{name} gauge', f'executor_{name} {value}']
+
+        lines += ['# HELP executor_cache_requests_total Cache lookups by result', '# TYPE executor_cache_requests_total counter']
+        for cache, (hits, misses) in caches.items():
+            lines.append(f'executor_cache_requests_total{{cache="{cache}",result="hit"}} {hits}')
+            lines.append(f'executor_cache_requests_total{{cache="{cache}",result="miss"}} {misses}')
+        lines += ['# HELP executor_cache_hit_ratio Hits over lookups since startup', '# TYPE executor_cache_hit_ratio gauge']
+        for cache, (hits, misses) in caches.items():
+            ratio = hits / (hits + misses) if hits + misses else 0.0
+            lines.append(f'executor_cache_hit_ratio{{cache="{cache}"}} {ratio:.4f}')
+        return '\n'.join(lines) + '\n'
+
+class LanguageBackend(ABC):
+    """
+    How the executor builds, runs and checks one language
+
+    A backend declares its names, source extension and candidate toolchains. The first
+    toolchain whose commands are all on PATH is picked at startup, so listing a faster
+    tool ahead of a common one uses it wherever it is installed. It also declares
+    whether its builds go through the compile cache (build_spec), whether results may
+    be memoized, its default resource limits, and whether a warm pool serves its runs.
+    MCPCodeExecutor dispatches every request through the backend registered for the
+    language, so a new language or toolchain is a subclass passed to register_backend().
+    Subclasses must implement prepare() and check(); an incomplete one fails when it is
+    registered rather than on its first request.
+    """
+
+    name = ''
+    aliases: Tuple[str, ...] = ()
+    extension = ''
+
+    # Candidate toolchains, preferred first. Each maps a role ('compile', 'run') to the
+    # command prefix used for it
+    TOOLCHAINS: List[Dict[str, List[str]]] = []
+
+    # Per-run limits (keys of RLIMITS, plus max_processes for the job cgroup's pids.max).
+    # None leaves a limit unset; cpu_seconds None means "the wall-clock timeout"
+    RESOURCE_LIMITS: Dict[str, Optional[int]] = {}
+
+    # Sources matching this are assumed to produce different results from run to run
+    # and are never served from the result cache unless the caller marks them
+    # deterministic; None makes the language's results never cacheable by default
+    NONDETERMINISTIC_PATTERN: Optional['re.Pattern[str]'] = None
+
+    def __init__(self, executor: 'MCPCodeExecutor', toolchains: Optional[List[Dict[str, List[str]]]] = None):
+        """
+        Bind the backend to an executor and pick its toolchain
+
+        Args:
+            executor (MCPCodeExecutor): Executor whose workspaces, caches and pools it uses
+            toolchains (list): Candidates overriding TOOLCHAINS, preferred first
+        """
+        self.executor = executor
+        candidates = toolchains or self.TOOLCHAINS
+        self.available = True
+        self.toolchain = next(
+            (toolchain for toolchain in candidates if all(shutil.which(cmd[0]) for cmd in toolchain.values())), None
+        )
+        if self.toolchain is None:
+            # Keep the preferred one so runs fail with the usual "not found" error
+            self.toolchain = candidates[0]
+            self.available = False
+            logger.warning(f"No {self.name} toolchain found on PATH (tried {candidates})")
+        else:
+            # Probed here, before serving: cache keys read the versions on the event loop
+            for tool in self.tools():
+                _toolchain_version(tool)
+
+    @property
+    def compiled(self) -> bool:
+        """Whether programs are built before they run"""
+        return 'compile' in self.toolchain
+
+    @property
+    def cacheable(self) -> bool:
+        """Whether results may be memoized when the source looks deterministic"""
+        return self.NONDETERMINISTIC_PATTERN is not None
+
+    @property
+    def pooled(self) -> bool:
+        """Whether a warm pool currently serves this language's runs"""
+        return False
+
+    def tools(self) -> List[str]:
+        """Executables whose versions identify the toolchain (part of the result cache key)"""
+        return [cmd[0] for cmd in self.toolchain.values()]
+
+    def looks_deterministic(self, code: str) -> bool:
+        """Heuristic: whether code avoids NONDETERMINISTIC_PATTERN (a miss only costs a re-run)"""
+        return self.cacheable and self.NONDETERMINISTIC_PATTERN.search(code) is None
+
+    def resolve_profile(self, profile: Optional[str]) -> Optional[str]:
+        """
+        The build profile a request runs under (None for languages without profiles)
+
+        Raises:
+            ValueError: profile is not one of the language's profiles
+        """
+        return None
+
+    def build_spec(self, code: str, profile: Optional[str] = None) -> Optional[Tuple[str, str, List[str]]]:
+        """(source, compiler, flags) the build is cached under; None if nothing is compiled"""
+        return None
+
+    @abstractmethod
+    def prepare(self, code: str, profile: Optional[str] = None) -> AsyncContextManager[Dict[str, Any]]:
+        """
+        Context manager yielding the program to run (see MCPCodeExecutor._run_program)
+
+        The program dict carries cmd, limits, timings and error (None, or the message
+        of a failed build), and optionally a 'run' coroutine function replacing cmd
+        (warm pools) plus compile_time and compile_cache for compiled languages.
+        """
+
+    @abstractmethod
+    async def check(self, code: str, profile: Optional[str] = None) -> Tuple[Optional[str], str]:
+        """Check code without running it; returns (error or None, what did the check)"""
+
+    def describe(self) -> Dict[str, Any]:
+        """Configuration shown by get_language_info()"""
+        return {
+            'extension': self.extension,
+            'compile_cmd': self.toolchain.get('compile'),
+            'run_cmd': self.toolchain.get('run', []),
+            'compiled': self.compiled,
+            'interpreter': not self.compiled,
+            'available': self.available,
+            'cacheable': self.cacheable,
+            'pooled': self.pooled,
+            'aliases': list(self.aliases)
+        }
+
+class PythonBackend(LanguageBackend):
+    """Python through a fresh interpreter per run, or children of the fork server when enabled"""
+
+    name = 'python'
+    extension = '.py'
+    TOOLCHAINS = [{'run': ['python']}, {'run': ['python3']}]
+    RESOURCE_LIMITS = {
+        'cpu_seconds': None,
+        'memory_bytes': 1024 * 1024 * 1024,
+        'max_processes': 128,
+        'file_size_bytes': 64 * 1024 * 1024,
+        'open_files': 256
+    }
+    NONDETERMINISTIC_PATTERN = re.compile(
+        r'\b(random|secrets|uuid|time|datetime|threading|multiprocessing|concurrent|asyncio|'
+        r'subprocess|socket|urllib|http|requests)\b|os\.(urandom|getpid|environ|getenv|listdir|scandir|walk)|'
+        r'\b(set|frozenset|hash|id)\s*\('
+    )
+
+    @property
+    def pooled(self) -> bool:
+        return self.executor.fork_server is not None
+
+    @asynccontextmanager
+    async def prepare(self, code: str, profile: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Write Python code to a pooled workspace and yield the program to run it"""
+        executor = self.executor
+        timer = PhaseTimer()
+        with executor.workspaces.lease() as temp_dir:
+            timer.lap('setup')
+            py_file = os.path.join(temp_dir, 'program.py')
+
+            with open(py_file, 'w') as f:
+                f.write(code)
+            timer.lap('write')
+
+            limits = executor.resource_limits[self.name]
+            program = {'cmd': [*self.toolchain['run'], py_file], 'error': None, 'limits': limits,
+                       'timings': timer.timings}
+            if executor.fork_server is not None:
+                program['run'] = lambda input_data: executor._run_blocking(
+                    executor.fork_server.run, py_file, input_data, executor.timeout, limits, executor.max_output_bytes
+                )
+            yield program
+
+    async def check(self, code: str, profile: Optional[str] = None) -> Tuple[Optional[str], str]:
+        """Compile to bytecode in-process (on a thread, since huge inputs take a while); never executed"""
+        def check() -> Optional[str]:
+            try:
+                compile(code, 'program.py', 'exec', dont_inherit=True)
+            except (SyntaxError, ValueError) as e:
+                return 'Syntax error: ' + ''.join(traceback.format_exception_only(type(e), e)).rstrip()
+            except (RecursionError, MemoryError):
+                return 'Syntax error: program is too deeply nested to compile'
+            return None
+
+        return await asyncio.to_thread(check), 'the Python compiler'
+
+class JavaBackend(LanguageBackend):
+    """Java through javac/java per job, or compiled and run in warm JVMs when the pool is enabled"""
+
+    name = 'java'
+    extension = '.java'
+    TOOLCHAINS = [{'compile': ['javac'], 'run': ['java']}]
+    RESOURCE_LIMITS = {
+        'cpu_seconds': None,
+        'memory_bytes': None,
+        'max_processes': 512,
+        'file_size_bytes': 64 * 1024 * 1024,
+        'open_files': 1024
+    }
+    NONDETERMINISTIC_PATTERN = re.compile(
+        r'\b(Random|SecureRandom|ThreadLocalRandom|UUID|Instant|Clock|LocalDate|LocalTime|LocalDateTime|'
+        r'Date|Thread|ExecutorService|Executors|ForkJoinPool|CompletableFuture|ProcessBuilder|Socket|URL)\b|'
+        r'Math\.random|System\.(currentTimeMillis|nanoTime|getenv|identityHashCode)|parallelStream|'
+        r'Runtime\.getRuntime'
+    )
+
+    # Submissions never use annotation processors; skipping the processor scan speeds up javac
+    JAVAC_FLAGS = ['-proc:none']
+
+    @property
+    def pooled(self) -> bool:
+        return self.executor.java_pool is not None
+
+    def build_spec(self, code: str, profile: Optional[str] = None) -> Optional[Tuple[str, str, List[str]]]:
+        return self.source(code)[1], self.toolchain['compile'][0], self.JAVAC_FLAGS
+
+    @asynccontextmanager
+    async def prepare(self, code: str, profile: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Compile Java code (or reuse a cached build) and yield the program to run it"""
+        executor = self.executor
+        class_name, source = self.source(code)
+
+        async def build(build_dir: str, timer: PhaseTimer) -> subprocess.CompletedProcess:
+            return await self.compile(class_name, source, build_dir, timer)
+
+        async with executor._compiled(*self.build_spec(code), build) as program:
+            if program['error'] is None:
+                class_dir = program.pop('artifact_dir')
+                program['cmd'] = [*self.toolchain['run'], '-cp', class_dir, class_name]
+                program['limits'] = executor.resource_limits[self.name]
+                if executor.java_pool is not None:
+                    # The worker protocol carries stdin inline, so stored inputs are read in full here
+                    program['run'] = lambda input_data: executor._run_blocking(
+                        executor.java_pool.run, class_dir, class_name, bytes(_stdin_bytes(input_data)),
+                        executor.timeout, executor.max_output_bytes
+                    )
+            yield program
+
+    async def compile(self, class_name: str, source: str, out_dir: str,
+                      timer: Optional[PhaseTimer] = None) -> subprocess.CompletedProcess:
+        """Compile one Java source into out_dir, in a warm JVM worker when the pool is enabled"""
+        executor = self.executor
+        if executor.java_pool is not None:
+            return await executor._run_blocking(executor.java_pool.compile, class_name, source, out_dir,
+                                                executor.timeout)
+
+        java_file = os.path.join(out_dir, f'{class_name}.java')
+
+        with open(java_file, 'w') as f:
+            f.write(source)
+        if timer is not None:
+            timer.lap('write')
+
+        return await executor._spawn([*self.toolchain['compile'], *self.JAVAC_FLAGS, '-d', out_dir, java_file])
+
+    async def check(self, code: str, profile: Optional[str] = None) -> Tuple[Optional[str], str]:
+        """Compile into a scratch workspace that is wiped afterwards; nothing is run"""
+        class_name, source = self.source(code)
+        with self.executor.workspaces.lease() as temp_dir:
+            result = await self.compile(class_name, source, temp_dir)
+
+        return (f'Compilation error: {result.stderr}' if result.returncode != 0 else None), 'javac'
+
+    def source(self, code: str) -> Tuple[str, str]:
+        """Class name and compilable source for a Java submission"""
+        # Extract class name or use default
+        class_name = self._extract_class_name(code) or 'Main'
+
+        # If no public class is defined, wrap code in a Main class
+        if 'public class' not in code:
+            code = f"public class {class_name} {{\n    public static void main(String[] args) {{\n{self._indent_code(code, 8)}\n    }}\n}}"
+        return class_name, code
+
+    @staticmethod
+    def _extract_class_name(code: str) -> Optional[str]:
+        """Extract the public class name from Java code"""
+        match = re.search(r'public\s+class\s+(\w+)', code)
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _indent_code(code: str, spaces: int) -> str:
+        """Indent code by specified number of spaces"""
+        indent = ' ' * spaces
+        return '\n'.join(indent + line if line.strip() else line for line in code.split('\n'))
+
+class JavaScriptBackend(LanguageBackend):
+    """JavaScript through node per job, or in worker_threads isolates of warm Node.js workers"""
+
+    name = 'javascript'
+    extension = '.js'
+    TOOLCHAINS = [{'run': ['node']}]
+    # RLIMIT_AS is left off because V8 reserves far more address space than it uses; a
+    # cgroup memory.max (or the pool's heap cap) covers memory instead
+    RESOURCE_LIMITS = {
+        'cpu_seconds': None,
+        'memory_bytes': None,
+        'max_processes': 256,
+        'file_size_bytes': 64 * 1024 * 1024,
+        'open_files': 1024
+    }
+    NONDETERMINISTIC_PATTERN = re.compile(
+        r'Math\.random|\bDate\b|\bperformance\b|\bcrypto\b|process\.(hrtime|pid|env|uptime|memoryUsage)|'
+        r'\b(setTimeout|setInterval|setImmediate|Worker|child_process|worker_threads|net|http|https|fetch)\b'
+    )
+
+    # JavaScript that reaches the process's own file descriptors (reading stdin through fd 0,
+    # writing through fd 1/2) or uses process APIs that worker_threads rejects would behave
+    # differently in a pooled isolate, so it is run by a fresh node process instead
+    POOL_INCOMPATIBLE = re.compile(
+        r'readFileSync\(\s*(0\b|[\'"]/dev/stdin)|/dev/std(in|out|err)|\b(read|write)Sync\(\s*[012]\b|'
+        r'\.fd\b|process\.(chdir|binding|_linkedBinding|dlopen|abort|umask|set[ug]id|sete[ug]id|setgroups)\b'
+    )
+
+    @property
+    def pooled(self) -> bool:
+        return self.executor.node_pool is not None
+
+    @asynccontextmanager
+    async def prepare(self, code: str, profile: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Write JavaScript code to a pooled workspace and yield the program to run it"""
+        executor = self.executor
+        timer = PhaseTimer()
+        with executor.workspaces.lease() as temp_dir:
+            timer.lap('setup')
+            js_file = os.path.join(temp_dir, 'program.js')
+
+            with open(js_file, 'w') as f:
+                f.write(code)
+            timer.lap('write')
+
+            program = {'cmd': [*self.toolchain['run'], js_file], 'error': None,
+                       'limits': executor.resource_limits[self.name], 'timings': timer.timings}
+            if executor.node_pool is not None and not self.POOL_INCOMPATIBLE.search(code):
+                program['run'] = lambda input_data: executor._run_blocking(
+                    executor.node_pool.run, js_file, input_data, executor.timeout, executor.max_output_bytes
+                )
+            yield program
+
+    async def check(self, code: str, profile: Optional[str] = None) -> Tuple[Optional[str], str]:
+        """Parse with node --check, which compiles the script without running it"""
+        with self.executor.workspaces.lease() as temp_dir:
+            js_file = os.path.join(temp_dir, 'program.js')
+
+            with open(js_file, 'w') as f:
+                f.write(code)
+
+            result = await self.executor._spawn([*self.toolchain['run'], '--check', js_file])
+
+        return (f'Syntax error: {result.stderr}' if result.returncode != 0 else None), 'node --check'
+
+class CppBackend(LanguageBackend):
+    """C++ built by a CppToolchain (profiles, precompiled headers, fastest linker) and run natively"""
+
+    name = 'cpp'
+    aliases = ('c++',)
+    extension = '.cpp'
+    TOOLCHAINS = [{'compile': ['g++']}, {'compile': ['clang++']}]
+    RESOURCE_LIMITS = {
+        'cpu_seconds': None,
+        'memory_bytes': 1024 * 1024 * 1024,
+        'max_processes': 128,
+        'file_size_bytes': 64 * 1024 * 1024,
+        'open_files': 256
+    }
+    NONDETERMINISTIC_PATTERN = re.compile(
+        r'\b(random_device|srand|time|clock|chrono|thread|async|getpid|fork|system|popen|getenv|'
+        r'__rdtsc|pthread_create)\b'
+    )
+
+    def __init__(self, executor: 'MCPCodeExecutor', toolchains: Optional[List[Dict[str, List[str]]]] = None):
+        super().__init__(executor, toolchains)
+        self.cpp = CppToolchain(executor.cpp_pch_dir, compiler=self.toolchain['compile'][0])
+        if self.available:
+            # The link probes block, so they run now rather than on the first request
+            self.cpp.linker_flags()
+
+    def resolve_profile(self, profile: Optional[str]) -> Optional[str]:
+        profile = profile or self.cpp.DEFAULT_PROFILE
+        if profile not in self.cpp.PROFILES:
+            raise ValueError(f'Unknown C++ profile: {profile}. Available: {", ".join(self.cpp.PROFILES)}')
+        return profile
+
+    def build_spec(self, code: str, profile: Optional[str] = None) -> Optional[Tuple[str, str, List[str]]]:
+        return code, self.cpp.compiler, self.cpp.flags(profile or self.cpp.DEFAULT_PROFILE)
+
+    @asynccontextmanager
+    async def prepare(self, code: str, profile: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Compile C++ code under a CppToolchain profile (or reuse a cached build) and yield the program to run it"""
+        executor = self.executor
+        profile = profile or self.cpp.DEFAULT_PROFILE
+        source, compiler, flags = self.build_spec(code, profile)
+
+        async def build(build_dir: str, timer: PhaseTimer) -> subprocess.CompletedProcess:
+            cpp_file = os.path.join(build_dir, 'program.cpp')
+            exe_file = os.path.join(build_dir, 'program')
+
+            with open(cpp_file, 'w') as f:
+                f.write(source)
+            timer.lap('write')
+
+            # The PCH only changes how the headers get parsed, so it stays out of the cache key
+            return await executor._spawn([compiler, *flags, *self.cpp.pch_flags(source, profile), '-o', exe_file, cpp_file])
+
+        async with executor._compiled(source, compiler, flags, build) as program:
+            if program['error'] is None:
+                program['cmd'] = [os.path.join(program.pop('artifact_dir'), 'program')]
+                program['limits'] = executor.resource_limits[self.name]
+            program['cpp_profile'] = profile
+            yield program
+
+    async def check(self, code: str, profile: Optional[str] = None) -> Tuple[Optional[str], str]:
+        """Parse and type-check with -fsyntax-only: no code generation, no link"""
+        profile = profile or self.cpp.DEFAULT_PROFILE
+        with self.executor.workspaces.lease() as temp_dir:
+            cpp_file = os.path.join(temp_dir, 'program.cpp')
+
+            with open(cpp_file, 'w') as f:
+                f.write(code)
+
+            result = await self.executor._spawn([
+                self.cpp.compiler, *self.cpp.compile_flags(profile), *self.cpp.pch_flags(code, profile),
+                '-fsyntax-only', cpp_file
+            ])
+
+        return (f'Compilation error: {result.stderr}' if result.returncode != 0 else None), f'{self.cpp.compiler} -fsyntax-only'
+
+    def describe(self) -> Dict[str, Any]:
+        return {**super().describe(), 'profiles': list(self.cpp.PROFILES)}
+
+# Registered by every MCPCodeExecutor unless it is given its own list
+DEFAULT_BACKENDS = [PythonBackend, JavaBackend, JavaScriptBackend, CppBackend]
+
 class MCPCodeExecutor:
     """
     Multi-language Code Processor and Executor
     Supports Python, Java, JavaScript (Node.js), and C++
+
+    Each language is a LanguageBackend in the executor's registry (DEFAULT_BACKENDS
+    unless told otherwise); requests are dispatched to the backend registered under the
+    language name or one of its aliases.
+
+    All execution is asynchronous: child processes are driven through asyncio, so a
+    single event loop can serve many clients without blocking on a slow submission.
     """
     
-    def __init__(self, timeout: int = 10):
+    # Write size when streaming stdin into a child
+    STDIN_CHUNK_BYTES = 1024 * 1024
+    
+    def __init__(self, timeout: int = 10, compile_cache_dir: Optional[str] = None,
+                 compile_cache_max_bytes: int = 512 * 1024 * 1024, enable_compile_cache: bool = True,
+                 max_workers: Optional[int] = None, max_queued_jobs: int = 64, max_queued_per_client: int = 16,
+                 java_pool_size: int = 0, java_pool_max_jobs: int = 100, node_pool_size: int = 0,
+                 node_pool_max_jobs: int = 100, node_pool_heap_mb: int = 512, python_fork_server: bool = False,
+                 stream_retain_bytes: int = 1024 * 1024, max_output_bytes: int = 8 * 1024 * 1024,
+                 resource_limits: Optional[Dict[str, Dict[str, Optional[int]]]] = None,
+                 cgroup_root: Optional[str] = None, enable_result_cache: bool = False,
+                 result_cache_ttl: float = 300.0, result_cache_max_bytes: int = 64 * 1024 * 1024,
+                 workspace_root: Optional[str] = None, workspace_pool_size: Optional[int] = None,
+                 cpp_pch_dir: Optional[str] = None, input_store_dir: Optional[str] = None,
+                 input_store_max_bytes: int = 1024 * 1024 * 1024, max_input_bytes: int = 256 * 1024 * 1024,
+                 result_cache_dir: Optional[str] = None,
+                 backends: Optional[List[type]] = None,
+                 toolchains: Optional[Dict[str, List[Dict[str, List[str]]]]] = None):
         """
         Initialize the code executor
         
         Args:
             timeout (int): Maximum execution time in seconds (default: 10)
+            compile_cache_dir (str): Directory for cached C++/Java build artifacts
+                (default: <tmp>/mcp_code_executor/compile_cache)
+            compile_cache_max_bytes (int): Size budget of the compile cache before LRU eviction
+            enable_compile_cache (bool): Reuse build artifacts for identical sources (default: True)
+            max_workers (int): Maximum number of compiles/runs in progress at once
+                (default: number of CPU cores)
+            max_queued_jobs (int): Jobs allowed to wait for one of the max_workers job slots;
+                further requests are rejected as busy with a retry_after hint (default: 64)
+            max_queued_per_client (int): Share of that queue a single client may hold
+            java_pool_size (int): Number of warm JVM workers used to compile and run Java
+                in-process; 0 disables the pool and spawns javac/java per job (default: 0)
+            java_pool_max_jobs (int): Jobs a JVM worker serves before it is recycled
+            node_pool_size (int): Number of warm Node.js workers that run JavaScript jobs in
+                worker_threads isolates; 0 disables the pool and spawns node per job (default: 0)
+            node_pool_max_jobs (int): Jobs a Node.js worker serves before it is recycled
+            node_pool_heap_mb (int): Heap cap of each pooled JavaScript job (default: 512)
+            python_fork_server (bool): Run Python jobs in children forked from a warm
+                interpreter with common stdlib modules preloaded; ignored when cgroup_root
+                is in use, since forked jobs cannot be placed in job cgroups (default: False)
+            stream_retain_bytes (int): Per-stream cap on output kept for the final result
+                of a streaming execution (head and tail halves; default: 1 MiB)
+            max_output_bytes (int): Per-stream cap on output kept from any other run; what
+                a program prints past it is dropped from the middle (default: 8 MiB)
+            resource_limits (dict): Per-language overrides of the backends' RESOURCE_LIMITS, e.g.
+                {'python': {'memory_bytes': 256 * 1024 * 1024}}
+            cgroup_root (str): Writable (delegated) cgroup v2 directory with the memory and
+                pids controllers enabled for its children. When set, every run is placed in
+                its own child cgroup, which bounds the whole process tree and gives exact
+                peak memory and CPU figures. It is also the only way max_processes is
+                enforced; without it that limit is left unset
+            enable_result_cache (bool): Serve repeated executions of deterministic programs
+                (same code, language, input and toolchain) from memory (default: False)
+            result_cache_ttl (float): Seconds a memoized result stays valid
+            result_cache_max_bytes (int): Memory budget of the result cache before LRU eviction
+            result_cache_dir (str): Keep the result cache in this directory instead of process
+                memory, shared by every executor process pointed at it (default: None)
+            workspace_root (str): Where per-job working directories are pooled
+                (default: /dev/shm/mcp_code_executor, falling back to the temp directory
+                when /dev/shm is missing or mounted noexec)
+            workspace_pool_size (int): Workspaces kept ready for reuse (default: 2 * max_workers)
+            cpp_pch_dir (str): Directory for C++ precompiled headers
+                (default: <tmp>/mcp_code_executor/pch)
+            input_store_dir (str): Directory for uploaded stdin inputs referenced by input_ref
+                (default: <tmp>/mcp_code_executor/inputs)
+            input_store_max_bytes (int): Size budget of the input store before LRU eviction
+            max_input_bytes (int): Largest single input the store accepts; bigger uploads are
+                rejected while they stream in (default: 256 MiB, at most input_store_max_bytes)
+            backends (list): LanguageBackend subclasses to register (default: DEFAULT_BACKENDS)
+            toolchains (dict): Per-language candidate toolchains overriding a backend's
+                TOOLCHAINS, preferred first, e.g. {'python': [{'run': ['pypy3']}, {'run': ['python']}]}
         """
         self.timeout = timeout
-        self.supported_languages = ['python', 'java', 'javascript', 'cpp', 'c++']
-        
-        # Language-specific configurations
-        self.language_config = {
-            'python': {
-                'extension': '.py',
-                'compile_cmd': None,
-                'run_cmd': ['python'],
-                'interpreter': True
-            },
-            'java': {
-                'extension': '.java',
-                'compile_cmd': ['javac'],
-                'run_cmd': ['java'],
-                'interpreter': False,
-                'class_template': 'public class {class_name} {{\n{code}\n}}'
-            },
-            'javascript': {
-                'extension': '.js',
-                'compile_cmd': None,
-                'run_cmd': ['node'],
-                'interpreter': True
-            },
-            'cpp': {
-                'extension': '.cpp',
-                'compile_cmd': ['g++', '-o'],
-                'run_cmd': [],
-                'interpreter': False
-            },
-            'c++': {
-                'extension': '.cpp',
-                'compile_cmd': ['g++', '-o'],
-                'run_cmd': [],
-                'interpreter': False
-            }
-        }
+        self.stream_retain_bytes = stream_retain_bytes
+        self.max_output_bytes = max_output_bytes
+        self.resource_limits = {}
+        self._resource_limit_overrides = resource_limits or {}
+        
+        self.cgroup_root = None
+        self._cgroup_ids = itertools.count()
+        if cgroup_root:
+            if os.access(os.path.join(cgroup_root, 'cgroup.subtree_control'), os.W_OK):
+                self.cgroup_root = cgroup_root
+            else:
+                logger.warning(f"cgroup_root {cgroup_root} is not a writable cgroup v2 directory; using rlimits only")
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.scheduler = JobScheduler(self.max_workers, max_queued=max_queued_jobs,
+                                      max_queued_per_client=max_queued_per_client)
+        self.metrics = ExecutorMetrics()
+        self._process_slots = asyncio.Semaphore(self.max_workers)
+        self.workspaces = WorkspacePool(workspace_root, size=workspace_pool_size or 2 * self.max_workers)
+        self.compile_cache = None
+        if enable_compile_cache:
+            cache_dir = compile_cache_dir or os.path.join(tempfile.gettempdir(), 'mcp_code_executor', 'compile_cache')
+            self.compile_cache = CompileCache(cache_dir, max_bytes=compile_cache_max_bytes)
+        
+        self.inputs = InputStore(input_store_dir or os.path.join(tempfile.gettempdir(), 'mcp_code_executor', 'inputs'),
+                                 max_bytes=input_store_max_bytes, max_input_bytes=max_input_bytes)
+        self.cpp_pch_dir = cpp_pch_dir or os.path.join(tempfile.gettempdir(), 'mcp_code_executor', 'pch')
+        
+        self.backends: Dict[str, LanguageBackend] = {}
+        self.supported_languages: List[str] = []
+        self._language_names: Dict[str, str] = {}
+        for backend_cls in backends or DEFAULT_BACKENDS:
+            self.register_backend(backend_cls, (toolchains or {}).get(backend_cls.name))
+        
+        self.result_cache = None
+        if enable_result_cache:
+            if result_cache_dir:
+                self.result_cache = SharedResultCache(result_cache_dir, ttl=result_cache_ttl,
+                                                      max_bytes=result_cache_max_bytes)
+            else:
+                self.result_cache = ResultCache(ttl=result_cache_ttl, max_bytes=result_cache_max_bytes)
+        
+        self.java_pool = None
+        if java_pool_size > 0:
+            if shutil.which('java') and shutil.which('javac'):
+                self.java_pool = JvmWorkerPool(java_pool_size, max_jobs_per_worker=java_pool_max_jobs)
+            else:
+                logger.warning("java_pool_size set but no JDK found on PATH; Java pool disabled")
+        
+        self.node_pool = None
+        if node_pool_size > 0:
+            if shutil.which('node'):
+                self.node_pool = NodeWorkerPool(node_pool_size, max_jobs_per_worker=node_pool_max_jobs,
+                                                heap_mb=node_pool_heap_mb, limits=self.resource_limits.get('javascript'))
+            else:
+                logger.warning("node_pool_size set but node is not on PATH; Node.js pool disabled")
+        
+        self.fork_server = None
+        if python_fork_server:
+            if self.cgroup_root is not None:
+                # Forked children stay in the zygote's cgroup, out of reach of per-job limits
+                logger.warning("python_fork_server is not used with cgroup_root; Python jobs run in job cgroups")
+            elif hasattr(os, 'fork') and hasattr(os, 'pidfd_open'):
+                self.fork_server = PythonForkServer(self.backends['python'].toolchain['run'][0])
+            else:
+                logger.warning("python_fork_server needs fork() and pidfd_open(); using a fresh interpreter per job")
+    
+    def register_backend(self, backend_cls: type,
+                         toolchains: Optional[List[Dict[str, List[str]]]] = None) -> LanguageBackend:
+        """
+        Add (or replace) the backend serving a language and its aliases
+        
+        Args:
+            backend_cls (type): LanguageBackend subclass
+            toolchains (list): Candidate toolchains overriding the backend's TOOLCHAINS
+            
+        Returns:
+            The registered backend
+            
+        Raises:
+            TypeError: backend_cls does not implement every abstract method
+        """
+        backend = backend_cls(self, toolchains)
+        limits = {**backend.RESOURCE_LIMITS, **self._resource_limit_overrides.get(backend.name, {})}
+        if limits.get('cpu_seconds') is None:
+            limits['cpu_seconds'] = int(self.timeout) + 1
+        if self.cgroup_root is None:
+            # Only a job cgroup can count a job's own processes (see RLIMITS)
+            limits['max_processes'] = None
+        self.resource_limits[backend.name] = limits
+        
+        self.backends[backend.name] = backend
+        for name in (backend.name, *backend.aliases):
+            self._language_names[name] = backend.name
+        self.supported_languages = list(self._language_names)
+        return backend
+    
+    def resolve_language(self, language: str) -> Optional[str]:
+        """Canonical name of a registered language name or alias (case-insensitive), or None"""
+        return self._language_names.get(language.lower())
+    
+    def _backend(self, language: str) -> Optional[LanguageBackend]:
+        """Backend registered under a language name or alias, or None"""
+        return self.backends.get(self.resolve_language(language))
+    
+    @property
+    def language_config(self) -> Dict[str, Dict[str, Any]]:
+        """Configuration of every registered language name and alias (see LanguageBackend.describe)"""
+        return {name: self.backends[backend].describe() for name, backend in self._language_names.items()}
     
-    def execute_code(self, code: str, language: str, input_data: str = "") -> Dict[str, Any]:
+    async def execute_code(self, code: str, language: str, input_data: str = "",
+                           on_output: Optional[OutputCallback] = None,
+                           client_id: str = 'anonymous', deterministic: Optional[bool] = None,
+                           cpp_profile: Optional[str] = None, input_ref: Optional[str] = None) -> Dict[str, Any]:
         """
         Execute code in the specified language
         
         Args:
-            code (str): The source code to execute
-            language (str): Programming language ('python', 'java', 'javascript', 'cpp', 'c++')
-            input_data (str): Input data for the program (optional)
+            code (str): The source code to execute
+            language (str): Programming language ('python', 'java', 'javascript', 'cpp', 'c++')
+            input_data (str): Input data for the program (optional)
+            on_output (callable): Streaming mode. Awaited with ('stdout' | 'stderr', text)
+                for each chunk while the program runs; the returned output is then capped
+                at stream_retain_bytes per stream instead of max_output_bytes
+            client_id (str): Caller identity for the scheduler's per-client fair share
+            deterministic (bool): Whether the program's result depends only on its code and
+                input, which lets the result cache serve it; None detects it from the source
+            cpp_profile (str): C++ compile profile from CppToolchain.PROFILES
+                (default: CppToolchain.DEFAULT_PROFILE)
+            input_ref (str): Ref of an input in the input store (see InputStore), streamed
+                to stdin instead of input_data
+            
+        Returns:
+            Dict containing execution results with keys:
+            - success (bool): Whether execution was successful
+            - output (str): Program output
+            - error (str): Error message if any
+            - truncated (bool): Whether output past the per-stream cap was dropped from
+              the middle of output/error (a marker shows where and how many bytes)
+            - execution_time (float): Time taken to execute
+            - language (str): Language used
+            - peak_memory_kb (int): Peak resident memory of the program run
+            - cpu_time (float): User + system CPU seconds of the program run
+            - compile_cache (str): 'hit', 'miss' or 'disabled' (compiled languages only)
+            - timings (dict): Monotonic seconds per phase: setup (workspace or build
+              directory), write (source file), compile, spawn, run and teardown. Phases
+              a job skips are left out, e.g. compile for interpreted languages or on a
+              compile cache hit, and spawn for warm pools
+            - cpp_profile (str): Compile profile used (C++ only)
+            - queue_time (float): Time spent waiting for a job slot
+            - cached (bool), cache_age (float): With the result cache enabled, whether the
+              result was served from it instead of running the program, and how old it is
+            - busy (bool), retry_after (float): Present when the job queue was full
+        """
+        backend = self._backend(language)
+        if backend is None:
+            return self._unsupported_language_result(language.lower())
+        language = backend.name
+        try:
+            profile = backend.resolve_profile(cpp_profile)
+        except ValueError as e:
+            return self._unknown_profile_result(language, str(e))
+        
+        stdin: StdinData = input_data
+        if input_ref is not None:
+            if input_data:
+                return self._input_error_result(language, 'Pass either input_data or input_ref, not both')
+            stdin = self.inputs.get(input_ref)
+            if stdin is None:
+                return self._unknown_input_result(language, input_ref)
+        
+        with self.metrics.track():
+            cache_key = None
+            if self.result_cache is not None:
+                if self._is_deterministic(code, language, deterministic):
+                    cache_key = self._result_cache_key(code, language, stdin, profile)
+                    cached = self.result_cache.get(cache_key)
+                    if cached is not None:
+                        if on_output is not None:
+                            for name, text in (('stdout', cached['output']), ('stderr', cached['error'])):
+                                if text:
+                                    await on_output(name, text)
+                        self.metrics.count(language, 'cached')
+                        return cached
+                else:
+                    self.result_cache.bypassed += 1
+            
+            async with self._admission(client_id, [(code, language)], profile) as queue_time:
+                if queue_time is None:
+                    self.metrics.count(language, 'busy')
+                    return self._busy_result(language)
+                
+                start_time = time.monotonic()
+                
+                try:
+                    result = await self._execute_prepared(backend.prepare(code, profile), stdin, on_output)
+                    
+                    result['execution_time'] = time.monotonic() - start_time
+                    result['language'] = language
+                    if self.result_cache is not None:
+                        if cache_key is not None and self._memoizable(result):
+                            self.result_cache.put(cache_key, result)
+                        result['cached'] = False
+                    result['queue_time'] = queue_time
+                    self.metrics.observe(language, {
+                        **result['timings'], 'queue': queue_time, 'total': result['execution_time']
+                    })
+                    self.metrics.count(language, 'success' if result['success'] else 'failure')
+                    return result
+                    
+                except Exception as e:
+                    self.metrics.count(language, 'failure')
+                    return {
+                        'success': False,
+                        'output': '',
+                        'error': f'Execution error: {str(e)}',
+                        'execution_time': time.monotonic() - start_time,
+                        'language': language
+                    }
+    
+    @asynccontextmanager
+    async def _admission(self, client_id: str, programs: List[Tuple[str, str]],
+                         profile: Optional[str] = None, slots: int = 1) -> AsyncIterator[Optional[float]]:
+        """
+        Queue a job with the scheduler and hold its slots for the duration of the block
+        
+        Args:
+            client_id (str): Caller identity for fair sharing
+            programs (list): (code, normalized language) pairs the job will build and run;
+                the job is COLD if any of them needs a compile the cache cannot serve
+            profile (str): Build profile the job's programs are built with (C++ only)
+            slots (int): Processes the job runs at once; jobs with several runs must keep
+                their concurrency within _job_slots(runs)
+            
+        Yields:
+            Seconds spent queued, or None when the queue was full and the job rejected
+        """
+        priority = self.scheduler.CHEAP
+        if any(self._needs_compile(code, language, profile) for code, language in programs):
+            priority = self.scheduler.COLD
+        
+        async with AsyncExitStack() as stack:
+            try:
+                queue_time = await stack.enter_async_context(self.scheduler.slot(client_id, priority, slots))
+            except ExecutorBusy:
+                yield None
+                return
+            yield queue_time
+    
+    def _job_slots(self, runs: int) -> int:
+        """Scheduler slots a job with this many runs holds (and so the runs it may start at once)"""
+        return max(1, min(runs, self.scheduler.max_running))
+    
+    def _is_deterministic(self, code: str, language: str, deterministic: Optional[bool]) -> bool:
+        """The caller's answer if given, else the backend's check of the source"""
+        if deterministic is not None:
+            return deterministic
+        return self.backends[language].looks_deterministic(code)
+    
+    def _result_cache_key(self, code: str, language: str, input_data: StdinData,
+                          profile: Optional[str] = None) -> str:
+        """Result cache key; the toolchain part covers tool versions, build flags and run limits"""
+        backend = self.backends[language]
+        spec = backend.build_spec(code, profile)
+        toolchain = json.dumps({
+            'versions': [_toolchain_version(tool) for tool in backend.tools()],
+            'flags': spec[2] if spec else [],
+            'limits': self.resource_limits[language]
+        }, sort_keys=True)
+        # Keyed by content hash, so a stored input and the same text passed inline share entries
+        if isinstance(input_data, InputBlob):
+            stdin = input_data.ref
+        else:
+            stdin = InputStore.make_ref(input_data.encode('utf-8'))
+        return self.result_cache.make_key(code, language, stdin, toolchain)
+    
+    @staticmethod
+    def _memoizable(result: Dict[str, Any]) -> bool:
+        """Whether a fresh result is worth memoizing: complete and not cut short by a limit"""
+        if result.get('truncated'):
+            return False
+        return not any(message in result['error'] for message in LIMIT_SIGNALS.values())
+    
+    def _needs_compile(self, code: str, language: str, profile: Optional[str] = None) -> bool:
+        """Whether running code requires a compile that the compile cache cannot serve"""
+        spec = self.backends[language].build_spec(code, profile)
+        if spec is None:
+            return False
+        if self.compile_cache is None:
+            return True
+        source, compiler, flags = spec
+        return not self.compile_cache.contains(
+            self.compile_cache.make_key(source, compiler, flags, _toolchain_version(compiler))
+        )
+    
+    def _busy_result(self, language: str) -> Dict[str, Any]:
+        """Result dict returned when the job queue is full"""
+        retry_after = self.scheduler.retry_after()
+        return {
+            'success': False,
+            'output': '',
+            'error': f'Server busy: {self.scheduler.running} jobs running and '
+                     f'{self.scheduler.queued} queued, retry after {retry_after}s',
+            'busy': True,
+            'retry_after': retry_after,
+            'execution_time': 0.0,
+            'language': language
+        }
+    
+    def _unknown_profile_result(self, language: str, message: str) -> Dict[str, Any]:
+        """Result dict returned for a build profile the language's backend rejected"""
+        return {
+            'success': False,
+            'output': '',
+            'error': message,
+            'execution_time': 0.0,
+            'language': language
+        }
+    
+    def _unknown_input_result(self, language: str, input_ref: str) -> Dict[str, Any]:
+        """Result dict returned for an input_ref the input store does not hold (never uploaded, or evicted)"""
+        result = self._input_error_result(
+            language, f'Unknown input_ref: {input_ref}. Upload the input first (upload_input or POST /inputs)'
+        )
+        result['missing_input_ref'] = input_ref
+        return result
+    
+    def _input_error_result(self, language: str, message: str) -> Dict[str, Any]:
+        """Result dict returned when the stdin arguments are unusable"""
+        return {
+            'success': False,
+            'output': '',
+            'error': message,
+            'execution_time': 0.0,
+            'language': language
+        }
+    
+    def _unsupported_language_result(self, language: str) -> Dict[str, Any]:
+        """Result dict returned for a language outside supported_languages"""
+        return {
+            'success': False,
+            'output': '',
+            'error': f'Unsupported language: {language}. Supported: {", ".join(self.supported_languages)}',
+            'execution_time': 0.0,
+            'language': language
+        }
+    
+    async def _execute_prepared(self, preparation: AsyncContextManager[Dict[str, Any]], input_data: StdinData,
+                                on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
+        """Run the program a backend's prepare() context manager yields and time its teardown"""
+        async with preparation as program:
+            result = await self._run_program(program, input_data, on_output)
+            teardown_start = time.monotonic()
+        result['timings']['teardown'] = time.monotonic() - teardown_start
+        return result
+    
+    def _prepare(self, code: str, language: str, profile: Optional[str] = None) -> AsyncContextManager[Dict[str, Any]]:
+        """The registered backend's prepare() context manager (language must be normalized)"""
+        return self.backends[language].prepare(code, profile)
+    
+    async def _spawn(self, cmd: List[str], input_data: Optional[StdinData] = None,
+                     on_output: Optional[OutputCallback] = None,
+                     limits: Optional[Dict[str, Optional[int]]] = None) -> ExecutionResult:
+        """
+        Run a child process without blocking the event loop
+        
+        Mirrors subprocess.run(cmd, input=input_data, capture_output=True, text=True,
+        timeout=self.timeout), including raising subprocess.TimeoutExpired after killing
+        the child (and its process group). Waits for one of the max_workers process
+        slots first.
+        
+        Args:
+            cmd (list): Command line to execute
+            input_data (str | InputBlob): Data written to stdin (a stored input is streamed
+                from its memory map); None connects stdin to /dev/null
+            on_output (callable): Streaming callback, awaited with ('stdout' | 'stderr', text)
+                for each chunk. Reads wait for the callback so a slow consumer throttles the
+                child instead of growing server memory
+            limits (dict): Resource limits (see LanguageBackend.RESOURCE_LIMITS) applied to the child
             
         Returns:
-            Dict containing execution results with keys:
-            - success (bool): Whether execution was successful
-            - output (str): Program output
-            - error (str): Error message if any
-            - execution_time (float): Time taken to execute
-            - language (str): Language used
+            ExecutionResult carrying the child's peak memory and CPU time, plus the time
+            spent starting it (spawn_time) and from then until it exited (run_time). Each
+            stream keeps a head/tail window of max_output_bytes (stream_retain_bytes when
+            streaming) and truncated tells whether anything in between was dropped
         """
-        language = language.lower()
-        
-        if language not in self.supported_languages:
-            return {
-                'success': False,
-                'output': '',
-                'error': f'Unsupported language: {language}. Supported: {", ".join(self.supported_languages)}',
-                'execution_time': 0.0,
-                'language': language
-            }
+        loop = asyncio.get_running_loop()
+        retain = self.stream_retain_bytes if on_output is not None else self.max_output_bytes
+        sinks = {name: OutputWindow(retain) for name in ('stdout', 'stderr')}
         
-        # Normalize c++ to cpp for internal processing
-        if language == 'c++':
-            language = 'cpp'
-        
-        start_time = time.time()
-        
-        try:
-            if language == 'python':
-                result = self._execute_python(code, input_data)
-            elif language == 'java':
-                result = self._execute_java(code, input_data)
-            elif language == 'javascript':
-                result = self._execute_javascript(code, input_data)
-            elif language == 'cpp':
-                result = self._execute_cpp(code, input_data)
+        async with self._process_slots:
+            # cgroupfs writes and the rmdir retries in _remove_cgroup block, so they run on a thread
+            cgroup = await asyncio.to_thread(self._create_cgroup, limits) if limits and self.cgroup_root else None
+            spawn_start = time.monotonic()
+            try:
+                process = subprocess.Popen(
+                    cmd,
+                    stdin=subprocess.DEVNULL if input_data is None else subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    start_new_session=True,
+                    preexec_fn=_child_limiter(limits, cgroup) if limits else None
+                )
+            except BaseException:
+                if cgroup is not None:
+                    await asyncio.to_thread(self._remove_cgroup, cgroup)
+                raise
+            spawned = time.monotonic()
             
-            result['execution_time'] = time.time() - start_time
-            result['language'] = language
-            return result
+            transports = []
             
-        except Exception as e:
-            return {
-                'success': False,
-                'output': '',
-                'error': f'Execution error: {str(e)}',
-                'execution_time': time.time() - start_time,
-                'language': language
-            }
-    
-    def _execute_python(self, code: str, input_data: str) -> Dict[str, Any]:
-        """Execute Python code"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            py_file = os.path.join(temp_dir, 'program.py')
+            async def feed_stdin() -> None:
+                if input_data is None:
+                    return
+                transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, process.stdin)
+                transports.append(transport)
+                writer = asyncio.StreamWriter(transport, protocol, None, loop)
+                payload = memoryview(_stdin_bytes(input_data))
+                try:
+                    # Chunked so the transport never buffers more than one chunk of a large input
+                    for offset in range(0, len(payload), self.STDIN_CHUNK_BYTES):
+                        writer.write(payload[offset:offset + self.STDIN_CHUNK_BYTES])
+                        await writer.drain()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    payload.release()
+                    transport.close()
             
-            with open(py_file, 'w') as f:
-                f.write(code)
+            async def pump(name: str, pipe: Any) -> None:
+                reader = asyncio.StreamReader(limit=1 << 16)
+                transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+                transports.append(transport)
+                decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                while True:
+                    chunk = await reader.read(65536)
+                    sinks[name].feed(chunk)
+                    if on_output is not None:
+                        text = decoder.decode(chunk, final=not chunk)
+                        if text:
+                            await on_output(name, text)
+                    if not chunk:
+                        return
             
-            result = subprocess.run(
-                ['python', py_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+            exit_status = asyncio.ensure_future(_reap_child(process.pid))
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(
+                        feed_stdin(),
+                        pump('stdout', process.stdout),
+                        pump('stderr', process.stderr),
+                        asyncio.shield(exit_status)
+                    ),
+                    timeout=self.timeout
+                )
+            except BaseException as e:
+                # Timed out or cancelled (e.g. the client went away): never leave the child running
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+                process.returncode, _ = await exit_status
+                if isinstance(e, asyncio.TimeoutError):
+                    raise subprocess.TimeoutExpired(cmd, self.timeout)
+                raise
+            finally:
+                for transport in transports:
+                    transport.close()
+                usage = await asyncio.to_thread(self._remove_cgroup, cgroup) if cgroup is not None else {}
             
-            return {
-                'success': result.returncode == 0,
-                'output': result.stdout,
-                'error': result.stderr
+            process.returncode, rusage = exit_status.result()
+            exited = time.monotonic()
+        
+        stdout, stderr = (sinks[name].getvalue() for name in ('stdout', 'stderr'))
+        truncated = any(window.truncated for window in sinks.values())
+        
+        return ExecutionResult(
+            cmd, process.returncode, stdout, stderr,
+            peak_memory_kb=usage.get('peak_memory_kb', rusage.ru_maxrss),
+            cpu_time=usage.get('cpu_time', rusage.ru_utime + rusage.ru_stime),
+            truncated=truncated,
+            spawn_time=spawned - spawn_start,
+            run_time=exited - spawned
+        )
+    
+    def _create_cgroup(self, limits: Dict[str, Optional[int]]) -> Optional[str]:
+        """Create a per-job cgroup v2 under cgroup_root with memory/pids limits; None if that fails"""
+        path = os.path.join(self.cgroup_root, f'job-{os.getpid()}-{next(self._cgroup_ids)}')
+        try:
+            os.mkdir(path)
+            settings = {
+                'memory.max': limits.get('memory_bytes'),
+                'memory.swap.max': 0 if limits.get('memory_bytes') else None,
+                'pids.max': limits.get('max_processes')
             }
+            for name, value in settings.items():
+                if value is not None and os.path.exists(os.path.join(path, name)):
+                    with open(os.path.join(path, name), 'w') as f:
+                        f.write(str(value))
+            return path
+        except OSError as e:
+            logger.warning(f"cgroup placement unavailable ({e}); using rlimits only")
+            self._remove_cgroup(path)
+            return None
     
-    def _execute_java(self, code: str, input_data: str) -> Dict[str, Any]:
-        """Execute Java code"""
-        # Extract class name or use default
-        class_name = self._extract_java_class_name(code) or 'Main'
+    def _remove_cgroup(self, path: Optional[str]) -> Dict[str, Any]:
+        """Read a job cgroup's peak memory and CPU usage, kill any leftovers, then remove it"""
+        usage = {}
+        if path is None or not os.path.isdir(path):
+            return usage
         
-        # If no public class is defined, wrap code in a Main class
-        if 'public class' not in code:
-            code = f"public class {class_name} {{\n    public static void main(String[] args) {{\n{self._indent_code(code, 8)}\n    }}\n}}"
+        try:
+            with open(os.path.join(path, 'memory.peak')) as f:
+                usage['peak_memory_kb'] = int(f.read()) // 1024
+        except (OSError, ValueError):
+            pass
+        try:
+            with open(os.path.join(path, 'cpu.stat')) as f:
+                stats = dict(line.split() for line in f if line.strip())
+            usage['cpu_time'] = int(stats['usage_usec']) / 1e6
+        except (OSError, ValueError, KeyError):
+            pass
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            java_file = os.path.join(temp_dir, f'{class_name}.java')
-            
-            with open(java_file, 'w') as f:
-                f.write(code)
-            
-            # Compile
-            compile_result = subprocess.run(
-                ['javac', java_file],
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+        try:
+            with open(os.path.join(path, 'cgroup.kill'), 'w') as f:
+                f.write('1')
+        except OSError:
+            pass
+        for _ in range(50):
+            try:
+                os.rmdir(path)
+                break
+            except OSError:
+                time.sleep(0.01)
+        return usage
+    
+    async def _run_blocking(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a blocking call (warm worker pools) on a thread while holding a process slot"""
+        async with self._process_slots:
+            return await asyncio.to_thread(func, *args)
+    
+    async def _run_program(self, program: Dict[str, Any], input_data: StdinData,
+                           on_output: Optional[OutputCallback] = None) -> Dict[str, Any]:
+        """
+        Run a prepared program against one input
+        
+        Args:
+            program (dict): Program yielded by a backend's prepare(); its optional
+                'run' coroutine function (input_data -> CompletedProcess) replaces spawning 'cmd'
+            input_data (str | InputBlob): Data passed on stdin
+            on_output (callable): Streaming callback, see execute_code(). Warm pools cannot
+                stream, so their output is forwarded in one piece once the run ends
             
-            if compile_result.returncode != 0:
-                return {
-                    'success': False,
-                    'output': '',
-                    'error': f'Compilation error: {compile_result.stderr}'
-                }
+        Returns:
+            Dict with success, output, error, peak_memory_kb and cpu_time (None where a warm
+            pool cannot measure them), truncated, compile_cache for compiled languages
+            and timings (the program's setup/write/compile phases plus
+            spawn and run; warm pools start no process, so their whole job counts as run)
+        """
+        timings = dict(program.get('timings', {}))
+        
+        if program['error'] is not None:
+            result = {
+                'success': False,
+                'output': '',
+                'error': program['error']
+            }
+        else:
+            if 'run' in program:
+                run_start = time.monotonic()
+                run_result = await program['run'](input_data)
+                timings['run'] = time.monotonic() - run_start
+                if on_output is not None:
+                    for name, text in (('stdout', run_result.stdout), ('stderr', run_result.stderr)):
+                        if text:
+                            await on_output(name, text)
+            else:
+                run_result = await self._spawn(program['cmd'], input_data, on_output, program.get('limits'))
+                timings['spawn'] = run_result.spawn_time
+                timings['run'] = run_result.run_time
             
-            # Run
-            run_result = subprocess.run(
-                ['java', '-cp', temp_dir, class_name],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+            error = run_result.stderr
+            if -run_result.returncode in LIMIT_SIGNALS:
+                error += f'\n{LIMIT_SIGNALS[-run_result.returncode]}'
             
-            return {
+            result = {
                 'success': run_result.returncode == 0,
                 'output': run_result.stdout,
-                'error': run_result.stderr
-            }
-    
-    def _execute_javascript(self, code: str, input_data: str) -> Dict[str, Any]:
-        """Execute JavaScript code using Node.js"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            js_file = os.path.join(temp_dir, 'program.js')
-            
-            with open(js_file, 'w') as f:
-                f.write(code)
-            
-            result = subprocess.run(
-                ['node', js_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
-            
-            return {
-                'success': result.returncode == 0,
-                'output': result.stdout,
-                'error': result.stderr
+                'error': error,
+                'truncated': bool(getattr(run_result, 'truncated', False))
             }
+            if isinstance(run_result, ExecutionResult):
+                result['peak_memory_kb'] = run_result.peak_memory_kb
+                result['cpu_time'] = run_result.cpu_time
+        
+        for key in ('compile_cache', 'cpp_profile'):
+            if key in program:
+                result[key] = program[key]
+        result['timings'] = timings
+        return result
     
-    def _execute_cpp(self, code: str, input_data: str) -> Dict[str, Any]:
-        """Execute C++ code"""
-        with tempfile.TemporaryDirectory() as temp_dir:
-            cpp_file = os.path.join(temp_dir, 'program.cpp')
-            exe_file = os.path.join(temp_dir, 'program')
-            
-            with open(cpp_file, 'w') as f:
-                f.write(code)
-            
-            # Compile
-            compile_result = subprocess.run(
-                ['g++', '-o', exe_file, cpp_file],
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
-            
-            if compile_result.returncode != 0:
-                return {
-                    'success': False,
-                    'output': '',
-                    'error': f'Compilation error: {compile_result.stderr}'
-                }
-            
-            # Run
-            run_result = subprocess.run(
-                [exe_file],
-                input=input_data,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+    @asynccontextmanager
+    async def _compiled(self, code: str, compiler: str, flags: List[str],
+                        build: Callable[[str, PhaseTimer], Awaitable[subprocess.CompletedProcess]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Provide a directory holding the build artifacts for code, compiling only on a cache miss
+        
+        Args:
+            code (str): Source code being built
+            compiler (str): Compiler executable, part of the cache key
+            flags (list): Compiler flags, part of the cache key
+            build (callable): Compiles into the given directory and returns the CompletedProcess;
+                laps 'write' on the timer once the sources are on disk
             
+        Yields:
+            Dict with artifact_dir, compile_cache status, compile_time (total), timings
+            (setup, write and compile phases) and error ('Compilation error: ...' or None
+            on success)
+        """
+        start_time = time.monotonic()
+        timer = PhaseTimer()
+        
+        def finish(artifact_dir: str, cache_status: str, result: Optional[subprocess.CompletedProcess]) -> Dict[str, Any]:
+            if result is not None:
+                timer.lap('compile')
+            failed = result is not None and result.returncode != 0
             return {
-                'success': run_result.returncode == 0,
-                'output': run_result.stdout,
-                'error': run_result.stderr
+                'artifact_dir': artifact_dir,
+                'compile_cache': cache_status,
+                'compile_time': time.monotonic() - start_time,
+                'timings': timer.timings,
+                'error': f'Compilation error: {result.stderr}' if failed else None
             }
+        
+        if self.compile_cache is None:
+            with self.workspaces.lease() as temp_dir:
+                timer.lap('setup')
+                yield finish(temp_dir, 'disabled', await build(temp_dir, timer))
+            return
+        
+        key = self.compile_cache.make_key(code, compiler, flags, _toolchain_version(compiler))
+        entry = self.compile_cache.lookup(key)
+        if entry is not None:
+            timer.lap('setup')
+            yield finish(str(entry), 'hit', None)
+            return
+        
+        build_dir = self.compile_cache.new_staging_dir()
+        timer.lap('setup')
+        try:
+            result = await build(str(build_dir), timer)
+        except BaseException:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            raise
+        
+        if result.returncode != 0:
+            shutil.rmtree(build_dir, ignore_errors=True)
+            yield finish('', 'miss', result)
+            return
+        
+        yield finish(str(self.compile_cache.store(key, build_dir)), 'miss', result)
     
-    def _extract_java_class_name(self, code: str) -> Optional[str]:
-        """Extract the public class name from Java code"""
-        import re
-        match = re.search(r'public\s+class\s+(\w+)', code)
-        return match.group(1) if match else None
-    
-    def _indent_code(self, code: str, spaces: int) -> str:
-        """Indent code by specified number of spaces"""
-        indent = ' ' * spaces
-        return '\n'.join(indent + line if line.strip() else line for line in code.split('\n'))
-    
-    def batch_execute(self, code_snippets: list) -> Dict[str, Any]:
+    async def batch_execute(self, code_snippets: list, client_id: str = 'anonymous') -> Dict[str, Any]:
         """
-        Execute multiple code snippets
+        Execute multiple code snippets concurrently
+        
+        Snippets sharing the same (code, language) are built once and the build is then
+        run against each snippet's input. Compilation of distinct programs and all runs
+        are fanned out together (bounded by max_workers), so a batch takes roughly as
+        long as its slowest compile plus its slowest run.
         
         Args:
             code_snippets (list): List of dictionaries with 'code', 'language', and optional 'input' keys
+            client_id (str): Caller identity for the scheduler's per-client fair share
             
         Returns:
-            Dict with execution results for each snippet
+            Dict with execution results for each snippet, in input order. The whole batch
+            is scheduled as one job holding a slot per run (up to max_workers). Besides the
+            execute_code keys every result carries compile_time, run_time and
+            shared_build (True when the build was reused by another snippet).
         """
         results = {}
+        programs: Dict[Tuple[str, str], List[Tuple[int, str]]] = {}
         
         for i, snippet in enumerate(code_snippets):
             if not isinstance(snippet, dict) or 'code' not in snippet or 'language' not in snippet:
-                results[f'snippet_{i}'] = {
+                results[i] = {
                     'success': False,
                     'output': '',
                     'error': 'Invalid snippet format. Required keys: code, language',
@@ -297,40 +3130,334 @@ class MCPCodeExecutor:
                 }
                 continue
             
-            code = snippet['code']
-            language = snippet['language']
-            input_data = snippet.get('input', '')
+            backend = self._backend(snippet['language'])
+            if backend is None:
+                results[i] = self._unsupported_language_result(snippet['language'].lower())
+                continue
+            
+            programs.setdefault((snippet['code'], backend.name), []).append((i, snippet.get('input', '')))
+        
+        with self.metrics.track():
+            await self._batch_jobs(programs, results, client_id)
+        
+        return {f'snippet_{i}': results[i] for i in range(len(code_snippets))}
+    
+    async def _batch_jobs(self, programs: Dict[Tuple[str, str], List[Tuple[int, str]]],
+                          results: Dict[int, Dict[str, Any]], client_id: str) -> None:
+        """Admit a batch as one job, build each distinct program once and fill results by snippet index"""
+        slots = self._job_slots(sum(len(runs) for runs in programs.values()))
+        # The batch starts no more builds and runs at once than it holds scheduler slots
+        concurrency = asyncio.Semaphore(slots)
+        async with self._admission(client_id, list(programs), slots=slots) as queue_time:
+            if queue_time is None:
+                for (_, language), runs in programs.items():
+                    for i, _ in runs:
+                        results[i] = self._busy_result(language)
+                        self.metrics.count(language, 'busy')
+                programs = {}
+            
+            async with AsyncExitStack() as stack:
+                # Build every distinct program once; builds stay alive until all runs finish
+                async def open_program(key: Tuple[str, str]) -> Dict[str, Any]:
+                    try:
+                        async with concurrency:
+                            return await stack.enter_async_context(self._prepare(*key))
+                    except Exception as e:
+                        return {'error': f'Execution error: {str(e)}', 'compile_time': 0.0}
+                
+                built = dict(zip(programs, await asyncio.gather(*(open_program(key) for key in programs))))
+                
+                jobs = [(i, key, input_data) for key, runs in programs.items() for i, input_data in runs]
+                
+                async def run_job(job: Tuple[int, Tuple[str, str], str]) -> Dict[str, Any]:
+                    _, key, input_data = job
+                    program = built[key]
+                    async with concurrency:
+                        result = await self._timed_run(program, input_data)
+                    result['compile_time'] = program.get('compile_time', 0.0)
+                    result['execution_time'] = result['compile_time'] + result['run_time']
+                    result['shared_build'] = len(programs[key]) > 1
+                    result['queue_time'] = queue_time
+                    result['language'] = key[1]
+                    return result
+                
+                for job, result in zip(jobs, await asyncio.gather(*(run_job(job) for job in jobs))):
+                    results[job[0]] = result
+                
+                for key, program in built.items():
+                    self._record_build(key[1], program, [results[i] for i, _ in programs[key]])
+    
+    async def execute_against_inputs(self, code: str, language: str, inputs: List[str],
+                                     expected: Optional[List[str]] = None,
+                                     client_id: str = 'anonymous',
+                                     cpp_profile: Optional[str] = None,
+                                     input_refs: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Compile a program once and run it concurrently against many stdin inputs
+        
+        Args:
+            code (str): The source code to execute
+            language (str): Programming language ('python', 'java', 'javascript', 'cpp', 'c++')
+            inputs (list): One stdin payload per test case
+            expected (list): Optional expected stdout per test case; outputs are compared
+                ignoring trailing whitespace on each line and trailing blank lines
+            client_id (str): Caller identity for the scheduler's per-client fair share
+            cpp_profile (str): C++ compile profile (see execute_code)
+            input_refs (list): Refs of stored inputs (see InputStore), run as further test
+                cases after inputs; expected then covers inputs followed by input_refs
+            
+        Returns:
+            Dict with success (all cases ran, and passed if expected was given),
+            passed/failed/total counts, compile_time, queue_time, wall_time, compile_cache and a
+            compact per-case list. Output is only echoed back when there is nothing to
+            compare against or the case failed.
+        """
+        backend = self._backend(language)
+        if backend is None:
+            return self._unsupported_language_result(language.lower())
+        language = backend.name
+        
+        stdins: List[StdinData] = list(inputs)
+        for input_ref in input_refs or []:
+            blob = self.inputs.get(input_ref)
+            if blob is None:
+                return self._unknown_input_result(language, input_ref)
+            stdins.append(blob)
+        
+        if expected is not None and len(expected) != len(stdins):
+            return {
+                'success': False,
+                'error': f'expected has {len(expected)} entries but there are {len(stdins)} inputs',
+                'language': language
+            }
+        
+        try:
+            profile = backend.resolve_profile(cpp_profile)
+        except ValueError as e:
+            return self._unknown_profile_result(language, str(e))
+        
+        start_time = time.monotonic()
+        slots = self._job_slots(len(stdins))
+        # The test cases start no more runs at once than the job holds scheduler slots
+        concurrency = asyncio.Semaphore(slots)
+        
+        async def run_case(program: Dict[str, Any], input_data: StdinData) -> Dict[str, Any]:
+            async with concurrency:
+                return await self._timed_run(program, input_data)
+        
+        with self.metrics.track():
+            async with self._admission(client_id, [(code, language)], profile, slots) as queue_time:
+                if queue_time is None:
+                    self.metrics.count(language, 'busy')
+                    return self._busy_result(language)
+                
+                try:
+                    async with backend.prepare(code, profile) as program:
+                        summary = {
+                            'language': language,
+                            'compile_time': program.get('compile_time', 0.0),
+                            'queue_time': queue_time
+                        }
+                        for key in ('compile_cache', 'cpp_profile'):
+                            if key in program:
+                                summary[key] = program[key]
+                        
+                        if program['error'] is not None:
+                            summary.update({
+                                'success': False,
+                                'error': program['error'],
+                                'total': len(stdins),
+                                'passed': 0,
+                                'failed': len(stdins),
+                                'cases': [],
+                                'wall_time': time.monotonic() - start_time
+                            })
+                            self._record_build(language, program, [])
+                            return summary
+                        
+                        runs = await asyncio.gather(*(run_case(program, input_data) for input_data in stdins))
+                        self._record_build(language, program, runs)
+                except Exception as e:
+                    self.metrics.count(language, 'failure')
+                    return {
+                        'success': False,
+                        'error': f'Execution error: {str(e)}',
+                        'language': language,
+                        'wall_time': time.monotonic() - start_time
+                    }
+            
+        cases = []
+        for i, run in enumerate(runs):
+            case = {'case': i, 'run_time': round(run['run_time'], 4)}
+            if not run['success']:
+                case.update({'status': 'error', 'error': run['error'], 'output': run['output']})
+            elif expected is None:
+                case.update({'status': 'ok', 'output': run['output']})
+            elif self._normalize_output(run['output']) == self._normalize_output(expected[i]):
+                case['status'] = 'pass'
+            else:
+                case.update({'status': 'fail', 'output': run['output'], 'expected': expected[i]})
+            cases.append(case)
+        
+        passed = sum(1 for case in cases if case['status'] in ('pass', 'ok'))
+        summary.update({
+            'success': passed == len(cases),
+            'total': len(cases),
+            'passed': passed,
+            'failed': len(cases) - passed,
+            'cases': cases,
+            'wall_time': time.monotonic() - start_time
+        })
+        return summary
+    
+    def _record_build(self, language: str, program: Dict[str, Any], runs: List[Dict[str, Any]]) -> None:
+        """Feed one shared build and the runs made from it to the metrics (a failed build counts as one failure)"""
+        self.metrics.observe(language, program.get('timings', {}))
+        if not runs:
+            self.metrics.count(language, 'failure')
+        for run in runs:
+            self.metrics.observe(language, {phase: run.get('timings', {}).get(phase) for phase in ('spawn', 'run')})
+            self.metrics.count(language, 'success' if run['success'] else 'failure')
+    
+    async def _timed_run(self, program: Dict[str, Any], input_data: StdinData) -> Dict[str, Any]:
+        """Run a prepared program, turning exceptions into a failed result and recording run_time"""
+        start_time = time.monotonic()
+        try:
+            result = await self._run_program(program, input_data)
+        except Exception as e:
+            result = {'success': False, 'output': '', 'error': f'Execution error: {str(e)}'}
+        result['run_time'] = time.monotonic() - start_time
+        return result
+    
+    @staticmethod
+    def _normalize_output(output: str) -> str:
+        """Canonical form used to compare program output with an expected answer"""
+        return '\n'.join(line.rstrip() for line in output.rstrip().splitlines())
+    
+    async def validate_syntax(self, code: str, language: str, cpp_profile: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Check code for errors without running it or producing a runnable build
+        
+        Python is compiled to bytecode in-process, JavaScript goes through node --check,
+        C++ through g++ -fsyntax-only (using the profile's flags and precompiled headers)
+        and Java through javac with annotation processing off into a throwaway workspace.
+        The compiled languages are also type-checked.
+        
+        Args:
+            code (str): The source code to check
+            language (str): Programming language ('python', 'java', 'javascript', 'cpp', 'c++')
+            cpp_profile (str): C++ compile profile whose flags the check uses
             
-            results[f'snippet_{i}'] = self.execute_code(code, language, input_data)
+        Returns:
+            Dict with valid, language, check_time and either message or error
+        """
+        backend = self._backend(language)
+        if backend is None:
+            return {
+                'valid': False,
+                'error': f'Unsupported language: {language.lower()}',
+                'language': language.lower()
+            }
+        language = backend.name
+        try:
+            profile = backend.resolve_profile(cpp_profile)
+        except ValueError as e:
+            return {'valid': False, 'error': str(e), 'language': language}
         
-        return results
+        start_time = time.monotonic()
+        error, checked_by = await backend.check(code, profile)
+        result = {'valid': error is None, 'language': language, 'check_time': time.monotonic() - start_time}
+        if error is None:
+            result['message'] = f'No errors found by {checked_by}'
+        else:
+            result['error'] = error
+        return result
     
     def get_language_info(self) -> Dict[str, Any]:
         """Get information about supported languages"""
         return {
             'supported_languages': self.supported_languages,
             'timeout': self.timeout,
-            'language_details': {
-                lang: {
-                    'extension': config['extension'],
-                    'compiled': not config['interpreter'],
-                    'interpreter': config['interpreter']
-                }
-                for lang, config in self.language_config.items()
-                if lang != 'c++'  # Exclude duplicate c++
-            }
+            'max_workers': self.max_workers,
+            'resource_limits': self.resource_limits,
+            'cgroup_root': self.cgroup_root,
+            'scheduler': self.scheduler.stats(),
+            'java_pool': self.java_pool.stats() if self.java_pool else None,
+            'node_pool': self.node_pool.stats() if self.node_pool else None,
+            'python_fork_server': self.fork_server is not None,
+            'compile_cache': self.compile_cache.stats() if self.compile_cache else None,
+            'workspaces': self.workspaces.stats(),
+            'cpp_toolchain': self.backends['cpp'].cpp.stats() if 'cpp' in self.backends else None,
+            'result_cache': self.result_cache.stats() if self.result_cache else None,
+            'input_store': self.inputs.stats(),
+            'language_details': {name: backend.describe() for name, backend in self.backends.items()}
+        }
+    
+    def render_metrics(self) -> str:
+        """Prometheus text exposition of the job metrics plus scheduler, workspace and cache figures"""
+        scheduler = self.scheduler.stats()
+        gauges = {
+            'job_slots_busy': scheduler['running'],
+            'jobs_queued': scheduler['queued'],
+            'workspaces_idle': self.workspaces.stats()['idle']
         }
+        caches = {}
+        for name, cache in (('compile', self.compile_cache), ('result', self.result_cache)):
+            if cache is not None:
+                caches[name] = (cache.hits, cache.misses)
+        return self.metrics.render(gauges, caches)
+
+# Create global executor instance. executor_supervisor.py passes per-worker overrides of
+# these options (job slots, pool sizes, the shared result cache) as JSON in the environment.
+executor = MCPCodeExecutor(**{
+    'timeout': 15,
+    'node_pool_size': 2,
+    'enable_result_cache': True,
+    **json.loads(os.environ.get('CODE_EXECUTOR_OPTIONS', '{}'))
+})
+
+def _client_key(ctx: Optional[Context]) -> str:
+    """
+    Identity the scheduler shares capacity by: the peer address over HTTP, else the MCP session
 
-# Create global executor instance
-executor = MCPCodeExecutor(timeout=15)
+    Nothing the client sends is used (a fresh client_id in each call's _meta would escape
+    max_queued_per_client), and neither is the session over HTTP, which in stateless mode
+    (executor_supervisor.py workers) is new for every request. Clients behind one proxy
+    or NAT address therefore share one fair share.
+    """
+    if ctx is None:
+        return 'anonymous'
+    try:
+        request = ctx.request_context.request
+    except ValueError:
+        # Called outside of a request
+        return 'anonymous'
+    peer = getattr(request, 'client', None)
+    if peer is not None:
+        return f'peer-{peer.host}'
+    return f'session-{id(ctx.session):x}'
 
 @mcp.tool()
-def execute_code(code: str, language: str, input_data: str = "") -> dict:
-    """Execute code in the specified programming language (python, java, javascript, cpp, c++)"""
-    logger.info(f"Executing {language} code")
+async def execute_code(code: str, language: str, input_data: str = "", stream: bool = False,
+                       deterministic: Optional[bool] = None, cpp_profile: Optional[str] = None,
+                       input_ref: Optional[str] = None, ctx: Optional[Context] = None) -> dict:
+    """Execute code in the specified programming language (python, java, javascript, cpp, c++). With stream=true, output is sent as progress notifications while the program runs and the final output is capped. Repeated runs of deterministic programs with the same input are answered from a cache and flagged cached=true; pass deterministic=false to force a re-run (or true to allow caching when the automatic check declines). For C++, cpp_profile picks 'fast-compile' (-O0, default) or 'fast-run' (-O2). For large stdin, upload it once with upload_input and pass the returned input_ref instead of input_data."""
+    logger.info(f"Executing {language} code{' (streaming)' if stream else ''}")
+    
+    on_output: Optional[OutputCallback] = None
+    if stream and ctx is not None:
+        streamed = 0
+        
+        async def report_output(name: str, text: str) -> None:
+            nonlocal streamed
+            streamed += len(text)
+            await ctx.report_progress(progress=streamed, message=f'[{name}] {text}')
+        
+        on_output = report_output
     
     try:
-        result = executor.execute_code(code, language, input_data)
+        result = await executor.execute_code(code, language, input_data, on_output, _client_key(ctx), deterministic,
+                                             cpp_profile, input_ref)
         
         if result['success']:
             logger.info(f"Code executed successfully in {result['execution_time']:.3f}s")
@@ -350,46 +3477,91 @@ def execute_code(code: str, language: str, input_data: str = "") -> dict:
             'language': language
         }
 
-# Temporarily comment out batch_execute_code if still having issues
-# @mcp.tool()
-# def batch_execute_code(code_snippets: List[CodeSnippet]) -> dict:
-#     """Execute multiple code snippets. Each snippet should be a dict with 'code', 'language', and optional 'input' keys"""
-#     logger.info(f"Batch executing {len(code_snippets)} code snippets")
-#     
-#     try:
-#         # Convert Pydantic models to dict format expected by executor
-#         snippets_dict = []
-#         for snippet in code_snippets:
-#             snippets_dict.append({
-#                 'code': snippet.code,
-#                 'language': snippet.language,
-#                 'input': snippet.input
-#             })
-#         
-#         results = executor.batch_execute(snippets_dict)
-#         
-#         successful = sum(1 for result in results.values() if result['success'])
-#         logger.info(f"Batch execution completed: {successful}/{len(results)} successful")
-#         
-#         return {
-#             'success': True,
-#             'results': results,
-#             'summary': {
-#                 'total': len(results),
-#                 'successful': successful,
-#                 'failed': len(results) - successful
-#             }
-#         }
-#         
-#     except Exception as e:
-#         error_msg = f"Batch execution error: {str(e)}"
-#         logger.error(error_msg)
-#         return {
-#             'success': False,
-#             'error': error_msg,
-#             'results': {},
-#             'summary': {'total': 0, 'successful': 0, 'failed': 0}
-#         }
+@mcp.tool()
+async def batch_execute_code(code_snippets: List[CodeSnippet], ctx: Optional[Context] = None) -> dict:
+    """Execute multiple code snippets in parallel. Each snippet should be a dict with 'code', 'language', and optional 'input' keys"""
+    logger.info(f"Batch executing {len(code_snippets)} code snippets")
+    
+    try:
+        # Convert Pydantic models to dict format expected by executor
+        snippets_dict = []
+        for snippet in code_snippets:
+            snippets_dict.append({
+                'code': snippet.code,
+                'language': snippet.language,
+                'input': snippet.input
+            })
+        
+        start_time = time.monotonic()
+        results = await executor.batch_execute(snippets_dict, _client_key(ctx))
+        wall_time = time.monotonic() - start_time
+        
+        successful = sum(1 for result in results.values() if result['success'])
+        logger.info(f"Batch execution completed: {successful}/{len(results)} successful in {wall_time:.3f}s")
+        
+        return {
+            'success': True,
+            'results': results,
+            'summary': {
+                'total': len(results),
+                'successful': successful,
+                'failed': len(results) - successful,
+                'unique_programs': len({(s['code'], executor.resolve_language(s['language'])) for s in snippets_dict}),
+                'wall_time': wall_time
+            }
+        }
+        
+    except Exception as e:
+        error_msg = f"Batch execution error: {str(e)}"
+        logger.error(error_msg)
+        return {
+            'success': False,
+            'error': error_msg,
+            'results': {},
+            'summary': {'total': 0, 'successful': 0, 'failed': 0}
+        }
+
+@mcp.tool()
+async def execute_against_inputs(code: str, language: str, inputs: List[str], expected: Optional[List[str]] = None,
+                                 cpp_profile: Optional[str] = None, input_refs: Optional[List[str]] = None,
+                                 ctx: Optional[Context] = None) -> dict:
+    """Compile once and run the program against many stdin inputs in parallel, optionally checking each output against the expected one. For C++, cpp_profile picks 'fast-compile' (-O0, default) or 'fast-run' (-O2). Large inputs uploaded with upload_input can be passed as input_refs; they run after inputs, and expected covers both in that order."""
+    logger.info(f"Executing {language} code against {len(inputs) + len(input_refs or [])} inputs")
+    
+    try:
+        result = await executor.execute_against_inputs(code, language, inputs, expected, _client_key(ctx), cpp_profile,
+                                                       input_refs)
+        
+        if 'cases' in result:
+            logger.info(f"Test run completed: {result['passed']}/{result['total']} passed in {result['wall_time']:.3f}s")
+        else:
+            logger.warning(f"Test run failed: {result['error']}")
+        
+        return result
+        
+    except Exception as e:
+        error_msg = f"Unexpected error executing test cases: {str(e)}"
+        logger.error(error_msg)
+        return {
+            'success': False,
+            'error': error_msg,
+            'language': language
+        }
+
+@mcp.tool()
+async def upload_input(data: str) -> dict:
+    """Store a large stdin input for later runs and return its input_ref (the hex SHA-256 of the UTF-8 data). Pass input_ref to execute_code or input_refs to execute_against_inputs instead of sending the input again. Clients can compute the ref themselves and skip the upload while the input is still stored; a run with an unknown ref fails with missing_input_ref set. Inputs over the server's size limit are rejected with max_input_bytes set."""
+    try:
+        payload = data.encode('utf-8')
+        input_ref, stored = await asyncio.to_thread(executor.inputs.put, payload)
+        logger.info(f"{'Stored' if stored else 'Already had'} input {input_ref[:12]} ({len(payload)} bytes)")
+        return {'input_ref': input_ref, 'size': len(payload), 'stored': stored}
+    except InputTooLarge as e:
+        return {'error': str(e), 'max_input_bytes': e.limit}
+    except OSError as e:
+        error_msg = f"Error storing input: {str(e)}"
+        logger.error(error_msg)
+        return {'error': error_msg}
 
 @mcp.tool()
 def get_supported_languages() -> dict:
@@ -407,73 +3579,19 @@ def get_supported_languages() -> dict:
         return {'error': error_msg}
 
 @mcp.tool()
-def validate_syntax(code: str, language: str) -> dict:
-    """Validate code syntax without executing (for compiled languages like Java and C++)"""
+async def validate_syntax(code: str, language: str, cpp_profile: Optional[str] = None) -> dict:
+    """Check code for syntax errors (and, for Java and C++, type errors) without executing it. Works for python, java, javascript, cpp and c++."""
     logger.info(f"Validating {language} syntax")
     
     try:
-        language = language.lower()
-        if language == 'c++':
-            language = 'cpp'
-            
-        if language not in executor.supported_languages:
-            return {
-                'valid': False,
-                'error': f'Unsupported language: {language}'
-            }
-        
-        # For interpreted languages, we can't easily validate without execution
-        if language in ['python', 'javascript']:
-            return {
-                'valid': True,
-                'message': f'Syntax validation not available for {language} (interpreted language)',
-                'language': language
-            }
+        result = await executor.validate_syntax(code, language, cpp_profile)
         
-        # For compiled languages, try compilation only
-        if language == 'java':
-            result = executor._execute_java(code, "")
-            if 'Compilation error' in result.get('error', ''):
-                return {
-                    'valid': False,
-                    'error': result['error'],
-                    'language': language
-                }
-            else:
-                return {
-                    'valid': True,
-                    'message': 'Java code compiled successfully',
-                    'language': language
-                }
+        if result['valid']:
+            logger.info(f"Syntax check passed in {result['check_time']:.3f}s")
+        else:
+            logger.info(f"Syntax check failed: {result['error']}")
         
-        elif language == 'cpp':
-            # Try compilation only for C++
-            with tempfile.TemporaryDirectory() as temp_dir:
-                cpp_file = os.path.join(temp_dir, 'program.cpp')
-                exe_file = os.path.join(temp_dir, 'program')
-                
-                with open(cpp_file, 'w') as f:
-                    f.write(code)
-                
-                compile_result = subprocess.run(
-                    ['g++', '-o', exe_file, cpp_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=executor.timeout
-                )
-                
-                if compile_result.returncode != 0:
-                    return {
-                        'valid': False,
-                        'error': f'Compilation error: {compile_result.stderr}',
-                        'language': language
-                    }
-                else:
-                    return {
-                        'valid': True,
-                        'message': 'C++ code compiled successfully',
-                        'language': language
-                    }
+        return result
         
     except Exception as e:
         error_msg = f"Syntax validation error: {str(e)}"
@@ -484,6 +3602,57 @@ def validate_syntax(code: str, language: str) -> dict:
             'language': language
         }
 
+@mcp.resource("executor://queue")
+def get_queue_status() -> str:
+    """Job queue depth, running jobs, rejections and recent queue wait times"""
+    return json.dumps(executor.scheduler.stats(), indent=2)
+
+@mcp.resource("executor://metrics", mime_type="text/plain")
+def get_metrics() -> str:
+    """Prometheus-style metrics: phase latency histograms per language, jobs in flight and cache hit ratios"""
+    return executor.render_metrics()
+
+@mcp.custom_route("/inputs", methods=["POST"])
+async def upload_input_endpoint(request: Request) -> JSONResponse:
+    """upload_input over plain HTTP: the raw request body is streamed to the input store without buffering it"""
+    limit = executor.inputs.max_input_bytes
+    try:
+        # Refused before reading anything when the client announces the size
+        executor.inputs.check_size(int(request.headers.get('content-length', 0)))
+    except InputTooLarge as e:
+        return JSONResponse({'error': str(e), 'max_input_bytes': limit}, status_code=413)
+    except ValueError:
+        return JSONResponse({'error': 'Invalid Content-Length'}, status_code=400)
+    
+    # File writes and commit() (which may take the eviction lock and scan the store)
+    # run on threads, as the upload_input tool does
+    digest = hashlib.sha256()
+    staging = await asyncio.to_thread(executor.inputs.new_staging_file)
+    size = 0
+    try:
+        with open(staging, 'wb') as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                executor.inputs.check_size(size)
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        input_ref, stored = await asyncio.to_thread(executor.inputs.commit, staging, digest.hexdigest())
+    except InputTooLarge as e:
+        staging.unlink(missing_ok=True)
+        logger.warning(f"Rejected input upload: {e}")
+        return JSONResponse({'error': f'Input exceeds the {limit} byte limit', 'max_input_bytes': limit},
+                            status_code=413)
+    except Exception as e:
+        staging.unlink(missing_ok=True)
+        logger.error(f"Error storing uploaded input: {e}")
+        return JSONResponse({'error': f'Error storing input: {str(e)}'}, status_code=500)
+    return JSONResponse({'input_ref': input_ref, 'size': size, 'stored': stored}, status_code=201 if stored else 200)
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metrics_endpoint(request: Request) -> PlainTextResponse:
+    """The executor://metrics text on a plain HTTP route for Prometheus scrapers"""
+    return PlainTextResponse(executor.render_metrics(), media_type="text/plain; version=0.0.4")
+
 @mcp.resource("code-execution://{language}")
 def get_code_execution_resource(language: str) -> str:
     """Get code execution examples and templates for a specific language"""
@@ -675,13 +3844,36 @@ Language-specific tips:
 Use the code execution tools to:
 1. validate_syntax() - Check syntax before execution
 2. execute_code() - Run your complete program
-3. get_supported_languages() - View language configurations
+3. execute_against_inputs() - Run one program against many test inputs
+4. upload_input() - Store a large stdin once and reuse it by input_ref
+5. get_supported_languages() - View language configurations
 
 Remember to handle input/output properly and consider the {executor.timeout}s timeout limit.
 """
 
+async def _serve_on_socket(fd: int) -> None:
+    """Serve the streamable-HTTP app on an inherited listening socket (supervisor worker mode)"""
+    import uvicorn
+    
+    # Any worker may receive any request of a session, so no session state is kept. Every
+    # request then gets a session of its own, which is why _client_key shares scheduler
+    # capacity by peer address rather than by session
+    mcp.settings.stateless_http = True
+    config = uvicorn.Config(mcp.streamable_http_app(), log_level=mcp.settings.log_level.lower())
+    await uvicorn.Server(config).serve(sockets=[socket.socket(fileno=fd)])
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Code Executor MCP Server")
+    parser.add_argument('--listen-fd', type=int, default=None,
+                        help="serve on this inherited listening socket (set by executor_supervisor.py)")
+    args = parser.parse_args()
+    
     logger.info("Starting Code Executor MCP Server...")
     logger.info(f"Supported languages: {', '.join(executor.supported_languages)}")
     logger.info(f"Execution timeout: {executor.timeout} seconds")
-    mcp.run(transport="streamable-http")
\ No newline at end of file
+    if args.listen_fd is None:
+        mcp.run(transport="streamable-http")
+    else:
+        asyncio.run(_serve_on_socket(args.listen_fd))
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Multi-process supervisor for the code executor server.
+
+Binds the streamable-HTTP port once and starts N code_executor.py worker processes
+that all accept connections on that socket, so the kernel spreads clients over N
+event loops (and N interpreters) instead of one. Workers run FastMCP in stateless
+HTTP mode, so any of them can serve any request. Caches are shared on the host:
+compile artifacts, C++ precompiled headers and uploaded inputs already live on disk,
+and the supervisor points every worker at one shared result cache directory. The
+host's job slots are divided among the workers, and workers that die are restarted.
+
+Run with:
+    python executor_supervisor.py --workers 4 --port 8000
+"""
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, Optional, List
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXECUTOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'code_executor.py')
+
+# A worker that exits sooner than this after starting is restarted only after a pause,
+# so a worker that cannot start does not spin
+MIN_UPTIME_SECONDS = 5.0
+
+
+def default_result_cache_dir() -> str:
+    """Shared result cache next to the executor's RAM-backed workspaces when /dev/shm is available"""
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return '/dev/shm/mcp_code_executor_results'
+    return os.path.join(tempfile.gettempdir(), 'mcp_code_executor', 'results')
+
+
+class Supervisor:
+    """Owns the listening socket and keeps N executor workers running on it"""
+
+    def __init__(self, sock: socket.socket, workers: int, options: Dict[str, Any]):
+        """
+        Initialize the supervisor
+
+        Args:
+            sock (socket.socket): Bound, listening socket shared with every worker
+            workers (int): Number of worker processes to keep running
+            options (dict): MCPCodeExecutor keyword arguments applied in every worker
+        """
+        self.sock = sock
+        self.workers = workers
+        self.options = options
+        self.stopping = False
+        self._children: Dict[int, subprocess.Popen] = {}
+        self._started: Dict[int, float] = {}
+
+    def _start(self, slot: int) -> None:
+        """Start (or restart) the worker for one slot"""
+        env = {**os.environ, 'CODE_EXECUTOR_OPTIONS': json.dumps(self.options)}
+        fd = self.sock.fileno()
+        child = subprocess.Popen([sys.executable, EXECUTOR, '--listen-fd', str(fd)], pass_fds=[fd], env=env)
+        self._children[slot] = child
+        self._started[slot] = time.monotonic()
+        logger.info(f"Started executor worker {slot} (pid {child.pid})")
+
+    def stop(self, signum: int, frame: Any) -> None:
+        """Signal handler: pass the shutdown on to every worker"""
+        self.stopping = True
+        for child in self._children.values():
+            if child.poll() is None:
+                child.send_signal(signal.SIGTERM)
+
+    def run(self) -> None:
+        """Start every worker and restart the ones that exit until the supervisor is stopped"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.workers):
+            self._start(slot)
+
+        while self._children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            slot = next((s for s, child in self._children.items() if child.pid == pid), None)
+            if slot is None:
+                continue
+            child = self._children.pop(slot)
+            child.returncode = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+
+            logger.warning(f"Executor worker {slot} (pid {pid}) exited with status {child.returncode}; restarting")
+            if time.monotonic() - self._started[slot] < MIN_UPTIME_SECONDS:
+                time.sleep(MIN_UPTIME_SECONDS)
+            if not self.stopping:
+                self._start(slot)
+        logger.info("All executor workers stopped")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description='Run N code executor workers behind one streamable-HTTP port')
+    parser.add_argument('--workers', type=int, default=cpus, help='worker processes (default: number of CPU cores)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--max-workers', type=int, default=None,
+                        help='job slots per worker (default: CPU cores divided among the workers)')
+    parser.add_argument('--java-pool-size', type=int, default=0,
+                        help='warm JVM workers per worker process (default: 0, javac/java per job)')
+    parser.add_argument('--node-pool-size', type=int, default=1, help='warm Node.js workers per worker process')
+    parser.add_argument('--python-fork-server', action='store_true', help='use the Python fork server in every worker')
+    parser.add_argument('--result-cache-dir', default=default_result_cache_dir(),
+                        help='result cache directory shared by the workers')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = parse_args(argv)
+    options = {
+        'max_workers': args.max_workers or max(1, (os.cpu_count() or 1) // args.workers),
+        'java_pool_size': args.java_pool_size,
+        'node_pool_size': args.node_pool_size,
+        'python_fork_server': args.python_fork_server,
+        'result_cache_dir': args.result_cache_dir
+    }
+
+    sock = socket.create_server((args.host, args.port), backlog=2048)
+    sock.set_inheritable(True)
+    logger.info(f"Serving {args.workers} executor workers on http://{args.host}:{args.port}/mcp")
+    try:
+        Supervisor(sock, args.workers, options).run()
+    finally:
+        sock.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""
+Python fork server (zygote) for the code executor's python path.
+
+Started once by PythonForkServer in code_executor.py with the path of a Unix socket to
+listen on. The interpreter pre-imports the stdlib modules submissions commonly use,
+then forks one child per job. Each job arrives on its own connection as a JSON request
+plus the child's stdin/stdout/stderr file descriptors (SCM_RIGHTS). The zygote replies
+with {"pid": ...} once the child is forked and {"status": ..., "usage": ...} when it
+exits. status follows subprocess returncode semantics (negative for a signal) and usage
+holds the child's peak_memory_kb and cpu_time from wait4(). A requester that closes its
+connection before then has given up on the job, and the child's process group is killed.
+
+Run with:
+    python python_zygote.py /path/to/zygote.sock
+"""
+import importlib
+import json
+import os
+import resource
+import runpy
+import selectors
+import signal
+import socket
+import sys
+import traceback
+
+# Same mapping as RLIMITS in code_executor.py
+RLIMITS = {
+    'cpu_seconds': resource.RLIMIT_CPU,
+    'memory_bytes': resource.RLIMIT_AS,
+    'file_size_bytes': resource.RLIMIT_FSIZE,
+    'open_files': resource.RLIMIT_NOFILE
+}
+
+# Imported once here so every forked job starts with them already loaded
+PRELOAD_MODULES = [
+    'bisect', 'collections', 'copy', 'dataclasses', 'datetime', 'decimal', 'fractions',
+    'functools', 'heapq', 'itertools', 'json', 'math', 'operator', 'random', 're',
+    'statistics', 'string', 'typing'
+]
+
+
+def run_job(request: dict) -> int:
+    """Run the submission in the forked child (fds 0-2 already wired) and return its exit code"""
+    script = request['script']
+
+    sys.stdin = sys.__stdin__ = open(0, 'r', closefd=False)
+    sys.stdout = sys.__stdout__ = open(1, 'w', closefd=False)
+    sys.stderr = sys.__stderr__ = open(2, 'w', buffering=1, errors='backslashreplace', closefd=False)
+    sys.argv = [script]
+    sys.path[0] = os.path.dirname(script)
+    os.chdir(request['cwd'])
+
+    try:
+        runpy.run_path(script, run_name='__main__')
+        return 0
+    except SystemExit as e:
+        if e.code is None:
+            return 0
+        if isinstance(e.code, int):
+            return e.code
+        print(e.code, file=sys.stderr)
+        return 1
+    except BaseException as e:
+        # Hide the runpy/zygote frames so the traceback reads like `python program.py`
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb)
+        return 1
+
+
+def fork_job(conn: socket.socket) -> int:
+    """Receive one job and fork the child that runs it; returns the child pid"""
+    message, fds, _, _ = socket.recv_fds(conn, 1 << 16, 3)
+    request = json.loads(message)
+
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            os.setsid()
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            os.closerange(3, os.sysconf('SC_OPEN_MAX'))
+            for name, value in request.get('limits', {}).items():
+                if value is not None and name in RLIMITS:
+                    hard = value + 1 if name == 'cpu_seconds' else value
+                    resource.setrlimit(RLIMITS[name], (value, hard))
+            code = run_job(request)
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    for fd in fds:
+        os.close(fd)
+    try:
+        conn.sendall(json.dumps({'pid': pid}).encode('utf-8') + b'\n')
+    except OSError:
+        # The requester is gone; serve() sees the hangup and kills the child
+        pass
+    return pid
+
+
+def kill_job(pid: int) -> None:
+    """SIGKILL a job's process group, or just the child if it has not called setsid() yet"""
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+def serve(socket_path: str) -> None:
+    """Accept jobs forever, reaping children through pidfds so the loop stays single-threaded"""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    selector = selectors.DefaultSelector()
+    selector.register(listener, selectors.EVENT_READ)
+
+    print('READY', flush=True)
+
+    while True:
+        for key, _ in selector.select():
+            if key.fileobj is listener:
+                conn, _ = listener.accept()
+                try:
+                    pid = fork_job(conn)
+                except Exception:
+                    traceback.print_exc()
+                    conn.close()
+                    continue
+                pidfd = os.pidfd_open(pid)
+                selector.register(pidfd, selectors.EVENT_READ, ('exit', pid, conn))
+                # Requesters send nothing after the request, so a readable connection
+                # means they hung up (timed out or died) and nobody owns the child
+                selector.register(conn, selectors.EVENT_READ, ('hangup', pid, conn))
+            elif key.data[0] == 'hangup':
+                _, pid, conn = key.data
+                selector.unregister(conn)
+                kill_job(pid)
+            else:
+                _, pid, conn = key.data
+                selector.unregister(key.fd)
+                os.close(key.fd)
+                try:
+                    selector.unregister(conn)
+                except KeyError:
+                    pass
+                _, status, rusage = os.wait4(pid, 0)
+                reply = {
+                    'status': os.waitstatus_to_exitcode(status),
+                    'usage': {'peak_memory_kb': rusage.ru_maxrss, 'cpu_time': rusage.ru_utime + rusage.ru_stime}
+                }
+                try:
+                    conn.sendall(json.dumps(reply).encode('utf-8') + b'\n')
+                except OSError:
+                    pass
+                conn.close()
+
+
+if __name__ == '__main__':
+    for name in PRELOAD_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    serve(sys.argv[1])
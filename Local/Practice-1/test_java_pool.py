@@ -0,0 +1,79 @@
+"""
+Tests for the warm JVM pool (JvmWorkerPool / JvmWorker.java).
+
+Pooled jobs must behave like `javac` + `java` per job: stdin, exit status and capped
+output come back the same, and a worker is recycled after a job it cannot safely
+outlive. Run with:
+    python -m unittest test_java_pool
+"""
+import asyncio
+import shutil
+import unittest
+
+import code_executor
+from code_executor import MCPCodeExecutor
+
+
+@unittest.skipIf(shutil.which('javac') is None or shutil.which('java') is None, 'no JDK on PATH')
+class JavaPoolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = MCPCodeExecutor(timeout=15, java_pool_size=1, max_output_bytes=1024)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.java_pool.close()
+        cls.executor.workspaces.close()
+
+    def run_pooled(self, code: str, input_data: str = '') -> dict:
+        return asyncio.run(self.executor.execute_code(code, 'java', input_data))
+
+    def test_scanner_template(self):
+        # The template the server hands out, between its title and its usage notes
+        resource = code_executor.get_code_execution_resource('java')
+        code = resource.split('\n\n', 1)[1].split('\n\nUsage Instructions:', 1)[0]
+        result = self.run_pooled(code, 'Bob\n')
+        self.assertTrue(result['success'], result)
+        self.assertIn('Hello, Bob!', result['output'])
+
+    def test_unread_stdin(self):
+        result = self.run_pooled('System.out.println(1);', 'x\ny\n')
+        self.assertTrue(result['success'], result)
+        self.assertEqual(result['output'], '1\n')
+
+    def test_compile_error(self):
+        result = self.run_pooled('int x = ;')
+        self.assertFalse(result['success'])
+        self.assertIn('Compilation error', result['error'])
+
+    def test_exception(self):
+        result = self.run_pooled('throw new IllegalStateException("boom");')
+        self.assertFalse(result['success'])
+        self.assertIn('IllegalStateException: boom', result['error'])
+
+    def test_output_is_capped(self):
+        result = self.run_pooled('System.out.print("a".repeat(3000)); System.out.print("b".repeat(3000));')
+        self.assertTrue(result['success'], result)
+        self.assertTrue(result['truncated'])
+        self.assertTrue(result['output'].startswith('a' * 512 + '\n... [4976 bytes truncated] ...\n'))
+        self.assertTrue(result['output'].endswith('b' * 512))
+
+    def test_system_exit_recycles_worker(self):
+        recycled = self.executor.java_pool.recycled
+        result = self.run_pooled('System.out.println("bye"); System.exit(3);')
+        self.assertFalse(result['success'])
+        self.assertEqual(result['output'], 'bye\n')
+        self.assertEqual(self.executor.java_pool.recycled, recycled + 1)
+        self.assertTrue(self.run_pooled('System.out.println(2);')['success'])
+
+    def test_leftover_thread_recycles_worker(self):
+        recycled = self.executor.java_pool.recycled
+        code = 'Thread t = new Thread(() -> { try { Thread.sleep(60000); } catch (InterruptedException e) {} }); t.start();'
+        self.assertTrue(self.run_pooled(code)['success'])
+        self.assertEqual(self.executor.java_pool.recycled, recycled + 1)
+        self.assertEqual(self.run_pooled('System.out.println(3);')['output'], '3\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""
+Regression tests for the warm Node.js pool (NodeWorkerPool / NodeWorker.js).
+
+A pooled job has to finish as soon as its program does, like `node <file>`, even when it
+leaves part of its stdin unread. Run with:
+    python -m unittest test_node_pool
+"""
+import asyncio
+import shutil
+import time
+import unittest
+
+import code_executor
+from code_executor import MCPCodeExecutor
+
+
+@unittest.skipIf(shutil.which('node') is None, 'node is not installed')
+class NodePoolStdinTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.executor = MCPCodeExecutor(timeout=5, node_pool_size=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.executor.node_pool.close()
+        cls.executor.workspaces.close()
+
+    def run_pooled(self, code: str, input_data: str) -> dict:
+        started = time.monotonic()
+        result = asyncio.run(self.executor.execute_code(code, 'javascript', input_data))
+        # Well under the 5 s timeout: the job did not wait for its unread stdin
+        self.assertLess(time.monotonic() - started, 3)
+        return result
+
+    def test_unread_stdin(self):
+        result = self.run_pooled('console.log(1)', 'x\ny\n')
+        self.assertTrue(result['success'], result)
+        self.assertEqual(result['output'], '1\n')
+
+    def test_readline_template(self):
+        # The template the server hands out, between its title and its usage notes
+        resource = code_executor.get_code_execution_resource('javascript')
+        code = resource.split('\n\n', 1)[1].split('\n\nUsage Instructions:', 1)[0]
+        result = self.run_pooled(code, 'Bob\n')
+        self.assertTrue(result['success'], result)
+        self.assertIn('Hello, Bob!', result['output'])
+
+    def test_stdin_read_to_end(self):
+        code = "let s = ''; process.stdin.on('data', d => s += d).on('end', () => console.log(s.length));"
+        result = self.run_pooled(code, 'abc\n' * 1000)
+        self.assertEqual(result['output'], '4000\n')
+
+    def test_stored_input(self):
+        ref, _ = self.executor.inputs.put(b'line\n' * 10)
+        code = "require('readline').createInterface({input: process.stdin}).once('line', l => console.log(l));"
+        started = time.monotonic()
+        result = asyncio.run(self.executor.execute_code(code, 'javascript', input_ref=ref))
+        self.assertLess(time.monotonic() - started, 3)
+        self.assertEqual(result['output'], 'line\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
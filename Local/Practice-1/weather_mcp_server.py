@@ -1,136 +1,417 @@
 """
 Weather FastMCP server example with improved error handling.
+Weather documents parsed from wttr.in are cached in process; tune the cache with the
+WEATHER_CACHE_TTL, WEATHER_CACHE_STALE (seconds) and WEATHER_CACHE_MAX_ENTRIES
+environment variables.
 Run with:
     python weather_server.py
 """
-import requests
+import asyncio
+import httpx
+import importlib.util
 import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from mcp.server.fastmcp import FastMCP
+from pydantic import BaseModel
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Weather changes on the order of minutes, so weather documents are reused for CACHE_TTL
+# seconds and served stale (while refreshed in the background) for CACHE_STALE more
+CACHE_TTL = float(os.environ.get("WEATHER_CACHE_TTL", 600))
+CACHE_STALE = float(os.environ.get("WEATHER_CACHE_STALE", 1800))
+CACHE_MAX_ENTRIES = int(os.environ.get("WEATHER_CACHE_MAX_ENTRIES", 1024))
+
+# One pooled keep-alive client serves every lookup. Connecting should be quick, while
+# wttr.in can take several seconds to build a report
+WTTR_URL = "https://wttr.in"
+HTTP_TIMEOUT = httpx.Timeout(connect=5.0, read=15.0, write=5.0, pool=10.0)
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=50, keepalive_expiry=60.0)
+
+# get_weather_bulk: most locations per call, and most upstream lookups it runs at once
+BULK_MAX_LOCATIONS = 50
+BULK_CONCURRENCY = 16
+
 mcp = FastMCP("WeatherServer")
 
+class WeatherServiceError(Exception):
+    """Raised when wttr.in answers with a non-200 status"""
+
+class SingleFlight:
+    """
+    Request coalescing: concurrent calls for the same key share one execution of the
+    coroutine function, and every caller gets its result (or its exception). The shared
+    call runs as its own task, so a caller that gives up does not cancel it for the
+    others. Counts the calls that were issued and the ones that joined a call in flight.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[str, asyncio.Task] = {}
+        self.issued = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """Await fn(*args) unless a call for key is already running, in which case await that one"""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = asyncio.ensure_future(fn(*args))
+            flight.add_done_callback(lambda task: self._finish(key, task))
+            self._flights[key] = flight
+            self.issued += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(flight)
+    
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # Every waiter may have been cancelled; the error was still seen
+        if not task.cancelled():
+            task.exception()
+    
+    def stats(self) -> Dict[str, int]:
+        return {
+            'in_flight': len(self._flights),
+            'issued': self.issued,
+            'coalesced': self.coalesced
+        }
+
+class WeatherCache:
+    """
+    In-process TTL cache for parsed weather documents, keyed by normalized location.
+    
+    Entries younger than ttl are served as they are. Entries up to stale seconds older
+    than that are still served, while a background task fetches a fresh copy, so a
+    slow upstream does not stall callers. Anything older is fetched before returning.
+    Loads (inline and background) go through a SingleFlight, so concurrent lookups of a
+    location share one upstream fetch. At most max_entries locations are kept; the least
+    recently used one is evicted first.
+    """
+    
+    def __init__(self, ttl: float = CACHE_TTL, stale: float = CACHE_STALE, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.stale = stale
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self.flights = SingleFlight()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    @staticmethod
+    def normalize(location: str) -> str:
+        """Cache key for a location: case and surrounding/repeated whitespace do not matter"""
+        return " ".join(location.lower().split())
+    
+    async def get(self, location: str, loader: Callable[[str], Awaitable[Any]]) -> Any:
+        """Return the cached value for a location, awaiting loader(location) when there is none"""
+        key = self.normalize(location)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl + self.stale:
+                self._entries.move_to_end(key)
+                if age < self.ttl:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing[key] = asyncio.ensure_future(self._refresh(key, location, loader))
+                return entry[1]
+        self.misses += 1
+        
+        return await self.flights.do(key, self._load, key, location, loader)
+    
+    async def _load(self, key: str, location: str, loader: Callable[[str], Awaitable[Any]]) -> Any:
+        value = await loader(location)
+        self._store(key, value)
+        return value
+    
+    async def _refresh(self, key: str, location: str, loader: Callable[[str], Awaitable[Any]]) -> None:
+        """Background refresh of a stale entry; on failure the stale value stays in place"""
+        try:
+            await self.flights.do(key, self._load, key, location, loader)
+        except Exception as e:
+            logger.warning(f"Background refresh failed for {location}: {str(e)}")
+        finally:
+            self._refreshing.pop(key, None)
+    
+    def _store(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'stale_seconds': self.stale,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'upstream': self.flights.stats()
+        }
+
+weather_cache = WeatherCache()
+
+_http_client: Optional[httpx.AsyncClient] = None
+
+def http_client() -> httpx.AsyncClient:
+    """
+    The server's shared upstream HTTP client, created on first use inside the event loop.
+    Connections are pooled and kept alive across lookups, and HTTP/2 is negotiated when
+    the optional h2 package is installed.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            base_url=WTTR_URL,
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=HTTP_TIMEOUT,
+            limits=HTTP_LIMITS,
+            headers={"User-Agent": "WeatherServer (MCP)"}
+        )
+    return _http_client
+
+async def close_http_client() -> None:
+    """Close the shared upstream client and its pooled connections"""
+    global _http_client
+    if _http_client is not None:
+        client, _http_client = _http_client, None
+        await client.aclose()
+
+async def fetch_weather_data(location: str) -> dict:
+    """Download the wttr.in JSON payload for a location"""
+    formatted_location = location.replace(" ", "+")
+    url = f"/{formatted_location}?format=j1"
+    logger.info(f"Requesting: {WTTR_URL}{url}")
+    
+    response = await http_client().get(url)
+    logger.info(f"Response status: {response.status_code} ({response.http_version})")
+    
+    if response.status_code != 200:
+        raise WeatherServiceError(f"Weather service returned status {response.status_code} for {location}")
+    return response.json()
+
+class CurrentConditions(BaseModel):
+    temp_c: str
+    temp_f: str
+    condition: str
+    humidity: str
+    wind_kmph: str
+    feels_like_c: str
+    feels_like_f: str
+
+class DailyForecast(BaseModel):
+    date: str
+    max_temp_c: str
+    max_temp_f: str
+    min_temp_c: str
+    min_temp_f: str
+    condition: str
+    chance_of_rain: str
+
+class WeatherDocument(BaseModel):
+    """
+    Everything the server reports about one location, parsed once from a wttr.in payload.
+    get_weather, get_forecast and the weather:// resource are views of this document.
+    """
+    location: str
+    current: Optional[CurrentConditions] = None
+    days: List[DailyForecast] = []
+    
+    @classmethod
+    def from_wttr(cls, location: str, data: dict) -> "WeatherDocument":
+        """
+        Parse a wttr.in j1 payload
+        
+        Args:
+            location (str): Location as requested, used when the payload names no area
+            data (dict): Decoded JSON payload
+            
+        Raises:
+            KeyError, IndexError: The payload is missing fields it claims to have
+        """
+        # Handle cases where nearest_area might be missing
+        location_name = location
+        if data.get('nearest_area'):
+            area = data['nearest_area'][0]
+            location_name = f"{area['areaName'][0]['value']}, {area['country'][0]['value']}"
+        
+        current = None
+        if data.get('current_condition'):
+            condition = data['current_condition'][0]
+            current = CurrentConditions(
+                temp_c=condition['temp_C'],
+                temp_f=condition['temp_F'],
+                condition=condition['weatherDesc'][0]['value'],
+                humidity=condition['humidity'],
+                wind_kmph=condition['windspeedKmph'],
+                feels_like_c=condition['FeelsLikeC'],
+                feels_like_f=condition['FeelsLikeF']
+            )
+        
+        days = [
+            DailyForecast(
+                date=day['date'],
+                max_temp_c=day['maxtempC'],
+                max_temp_f=day['maxtempF'],
+                min_temp_c=day['mintempC'],
+                min_temp_f=day['mintempF'],
+                condition=day['hourly'][0]['weatherDesc'][0]['value'],
+                chance_of_rain=day['hourly'][0]['chanceofrain']
+            )
+            for day in data.get('weather') or []
+        ]
+        return cls(location=location_name, current=current, days=days)
+    
+    def current_view(self) -> dict:
+        """Current conditions as returned by get_weather (requires current)"""
+        current = self.current
+        return {
+            'location': self.location,
+            'temperature': f"{current.temp_c}°C ({current.temp_f}°F)",
+            'condition': current.condition,
+            'humidity': f"{current.humidity}%",
+            'wind': f"{current.wind_kmph} km/h",
+            'feels_like': f"{current.feels_like_c}°C ({current.feels_like_f}°F)"
+        }
+    
+    def forecast_view(self, days: int) -> dict:
+        """The first days of the forecast as returned by get_forecast"""
+        return {
+            'location': self.location,
+            'forecast': [
+                {
+                    'date': day.date,
+                    'max_temp': f"{day.max_temp_c}°C ({day.max_temp_f}°F)",
+                    'min_temp': f"{day.min_temp_c}°C ({day.min_temp_f}°F)",
+                    'condition': day.condition,
+                    'chance_of_rain': f"{day.chance_of_rain}%"
+                }
+                for day in self.days[:max(0, days)]
+            ]
+        }
+
+async def load_weather_document(location: str) -> WeatherDocument:
+    """Fetch and parse the weather document for a location (cache loader)"""
+    return WeatherDocument.from_wttr(location, await fetch_weather_data(location))
+
+async def get_weather_document(location: str) -> WeatherDocument:
+    """The weather document for a location: one upstream fetch and parse per cache window"""
+    return await weather_cache.get(location, load_weather_document)
+
+def weather_error_message(location: str, error: Exception) -> str:
+    """User-facing message for a failure to get the weather document"""
+    if isinstance(error, WeatherServiceError):
+        return str(error)
+    if isinstance(error, httpx.HTTPError):
+        return f"Network error getting weather for {location}: {str(error)}"
+    if isinstance(error, (KeyError, IndexError)):
+        return f"Error parsing weather data for {location}: {str(error)}"
+    return f"Unexpected error getting weather for {location}: {str(error)}"
+
 @mcp.tool()
-def get_weather(location: str) -> dict:
+async def get_weather(location: str) -> dict:
     """Get current weather for any location"""
     logger.info(f"Getting weather for: {location}")
     
     try:
-        # Add more specific location formatting
-        formatted_location = location.replace(" ", "+")
-        url = f"http://wttr.in/{formatted_location}?format=j1"
-        logger.info(f"Requesting: {url}")
-        
-        response = requests.get(url, timeout=15)
-        logger.info(f"Response status: {response.status_code}")
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Check if we have the expected data structure
-            if 'current_condition' not in data or not data['current_condition']:
-                logger.error("No current condition data in response")
-                return {"error": f"No weather data available for {location}"}
-            
-            current = data['current_condition'][0]
-            
-            # Handle cases where nearest_area might be missing
-            location_name = location
-            if 'nearest_area' in data and data['nearest_area']:
-                area = data['nearest_area'][0]
-                location_name = f"{area['areaName'][0]['value']}, {area['country'][0]['value']}"
-            
-            result = {
-                'location': location_name,
-                'temperature': f"{current['temp_C']}°C ({current['temp_F']}°F)",
-                'condition': current['weatherDesc'][0]['value'],
-                'humidity': f"{current['humidity']}%",
-                'wind': f"{current['windspeedKmph']} km/h",
-                'feels_like': f"{current['FeelsLikeC']}°C ({current['FeelsLikeF']}°F)"
-            }
-            
-            logger.info(f"Weather data retrieved successfully: {result}")
-            return result
-        else:
-            error_msg = f"Weather service returned status {response.status_code} for {location}"
-            logger.error(error_msg)
-            return {"error": error_msg}
-            
-    except requests.RequestException as e:
-        error_msg = f"Network error getting weather for {location}: {str(e)}"
-        logger.error(error_msg)
-        return {"error": error_msg}
-    except (KeyError, IndexError) as e:
-        error_msg = f"Error parsing weather data for {location}: {str(e)}"
-        logger.error(error_msg)
-        return {"error": error_msg}
+        document = await get_weather_document(location)
     except Exception as e:
-        error_msg = f"Unexpected error getting weather for {location}: {str(e)}"
+        error_msg = weather_error_message(location, e)
         logger.error(error_msg)
         return {"error": error_msg}
+    
+    # Check if we have the expected data structure
+    if document.current is None:
+        logger.error("No current condition data in response")
+        return {"error": f"No weather data available for {location}"}
+    
+    result = document.current_view()
+    logger.info(f"Weather data retrieved successfully: {result}")
+    return result
 
 @mcp.tool()
-def get_forecast(location: str, days: int = 3) -> dict:
+async def get_forecast(location: str, days: int = 3) -> dict:
     """Get weather forecast for a location (up to 3 days)"""
     logger.info(f"Getting forecast for: {location}, days: {days}")
     
     try:
-        formatted_location = location.replace(" ", "+")
-        url = f"http://wttr.in/{formatted_location}?format=j1"
-        
-        response = requests.get(url, timeout=15)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            if 'weather' not in data or not data['weather']:
-                return {"error": f"No forecast data available for {location}"}
-            
-            forecast = []
-            
-            for i in range(min(days, len(data['weather']))):
-                day_data = data['weather'][i]
-                forecast.append({
-                    'date': day_data['date'],
-                    'max_temp': f"{day_data['maxtempC']}°C ({day_data['maxtempF']}°F)",
-                    'min_temp': f"{day_data['mintempC']}°C ({day_data['mintempF']}°F)",
-                    'condition': day_data['hourly'][0]['weatherDesc'][0]['value'],
-                    'chance_of_rain': f"{day_data['hourly'][0]['chanceofrain']}%"
-                })
-            
-            location_name = location
-            if 'nearest_area' in data and data['nearest_area']:
-                area = data['nearest_area'][0]
-                location_name = f"{area['areaName'][0]['value']}, {area['country'][0]['value']}"
-            
-            result = {
-                'location': location_name,
-                'forecast': forecast
-            }
-            
-            logger.info(f"Forecast data retrieved successfully")
-            return result
-        else:
-            error_msg = f"Weather service returned status {response.status_code} for {location}"
-            logger.error(error_msg)
-            return {"error": error_msg}
-            
+        document = await get_weather_document(location)
+    except WeatherServiceError as e:
+        error_msg = str(e)
+        logger.error(error_msg)
+        return {"error": error_msg}
     except Exception as e:
         error_msg = f"Error getting forecast for {location}: {str(e)}"
         logger.error(error_msg)
         return {"error": error_msg}
+    
+    if not document.days:
+        return {"error": f"No forecast data available for {location}"}
+    
+    logger.info(f"Forecast data retrieved successfully")
+    return document.forecast_view(days)
+
+@mcp.tool()
+async def get_weather_bulk(locations: List[str], include_forecast: bool = False, days: int = 3) -> dict:
+    """Get current weather (and optionally the forecast, up to 3 days) for several locations at once"""
+    logger.info(f"Getting weather for {len(locations)} locations (forecast: {include_forecast}, days: {days})")
+    
+    if len(locations) > BULK_MAX_LOCATIONS:
+        return {"error": f"At most {BULK_MAX_LOCATIONS} locations can be requested at once, got {len(locations)}"}
+    
+    semaphore = asyncio.Semaphore(BULK_CONCURRENCY)
+    
+    async def lookup(location: str) -> dict:
+        try:
+            async with semaphore:
+                document = await get_weather_document(location)
+        except Exception as e:
+            error_msg = weather_error_message(location, e)
+            logger.error(error_msg)
+            return {'query': location, 'error': error_msg}
+        
+        if document.current is None:
+            return {'query': location, 'error': f"No weather data available for {location}"}
+        
+        entry = {'query': location, **document.current_view()}
+        if include_forecast:
+            entry['forecast'] = document.forecast_view(days)['forecast']
+        return entry
+    
+    # Results come back in request order; repeated locations share one lookup via the cache
+    results = await asyncio.gather(*(lookup(location) for location in locations))
+    return {
+        'results': results,
+        'count': len(results),
+        'errors': sum(1 for result in results if 'error' in result)
+    }
 
 @mcp.resource("weather://{location}")
-def get_weather_resource(location: str) -> str:
+async def get_weather_resource(location: str) -> str:
     """Get weather data as a resource"""
-    weather_data = get_weather(location)
+    try:
+        document = await get_weather_document(location)
+    except Exception as e:
+        return f"Error: {weather_error_message(location, e)}"
     
-    if 'error' in weather_data:
-        return f"Error: {weather_data['error']}"
+    if document.current is None:
+        return f"Error: No weather data available for {location}"
     
+    weather_data = document.current_view()
     return f"""Weather Report for {weather_data['location']}
 
 Current Conditions:
@@ -140,6 +421,11 @@ Current Conditions:
 - Wind Speed: {weather_data['wind']}
 """
 
+@mcp.tool()
+async def get_weather_service_stats() -> dict:
+    """Get weather cache and upstream request counters (issued vs. coalesced lookups)"""
+    return weather_cache.stats()
+
 @mcp.prompt()
 def weather_analysis(location: str, context: str = "general") -> str:
     """Generate a weather analysis prompt"""
@@ -156,6 +442,17 @@ def weather_analysis(location: str, context: str = "general") -> str:
 Consider temperature, humidity, wind conditions, and any weather advisories. 
 Provide practical advice and recommendations."""
 
+async def serve() -> None:
+    """
+    Run the server over streamable HTTP, closing the shared upstream client on shutdown.
+    A FastMCP lifespan would not do here: it is entered once per MCP session, while the
+    client is shared by every session for the life of the server.
+    """
+    try:
+        await mcp.run_streamable_http_async()
+    finally:
+        await close_http_client()
+
 if __name__ == "__main__":
     logger.info("Starting Weather MCP Server...")
-    mcp.run(transport="streamable-http")
\ No newline at end of file
+    asyncio.run(serve())
\ No newline at end of file